@@ -0,0 +1,122 @@
+import asyncio
+import gzip
+import json
+from collections import deque
+from datetime import datetime as dt
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from .helpers import forget_member
+
+import logging
+
+log = logging.getLogger("red.burnacid.eventboard")
+
+
+class EventArchive:
+    """
+    Append-only archive of finished events.
+
+    Every guild has its own gzip compressed JSONL file. Each append adds a new gzip member,
+    so existing data is never rewritten and the whole file still reads as one stream.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._locks = {}
+
+    def guild_file(self, guild_id: int) -> Path:
+        return self.path / f"{guild_id}.jsonl.gz"
+
+    def _lock(self, guild_id: int) -> asyncio.Lock:
+        if guild_id not in self._locks:
+            self._locks[guild_id] = asyncio.Lock()
+        return self._locks[guild_id]
+
+    def _append(self, guild_id: int, events: List[dict]) -> None:
+        lines = ""
+        for event in events:
+            lines += json.dumps(event, separators=(",", ":")) + "\n"
+        with gzip.open(self.guild_file(guild_id), "at", encoding="utf-8") as archive_file:
+            archive_file.write(lines)
+
+    async def append(self, guild_id: int, *events: dict) -> None:
+        archived = (dt.now()).timestamp()
+        records = []
+        for event in events:
+            record = dict(event)
+            record["archived"] = archived
+            records.append(record)
+
+        async with self._lock(guild_id):
+            await asyncio.get_event_loop().run_in_executor(None, self._append, guild_id, records)
+
+    def iter_events(self, guild_id: int) -> Iterator[dict]:
+        """Stream archived events of a guild, oldest first"""
+        archive_file = self.guild_file(guild_id)
+        if not archive_file.exists():
+            return
+        with gzip.open(archive_file, "rt", encoding="utf-8") as archive_stream:
+            try:
+                for line in archive_stream:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        log.error(f"Skipping corrupt archive line for guild {guild_id}")
+            except EOFError:
+                # An append is still being written
+                return
+
+    def _forget_member(self, guild_id: int, member_id: int, anonymize_creator: bool) -> int:
+        events = list(self.iter_events(guild_id))
+        changed = 0
+        for event in events:
+            if forget_member(event, member_id, anonymize_creator):
+                changed += 1
+        if changed == 0:
+            return 0
+
+        archive_file = self.guild_file(guild_id)
+        rewritten = archive_file.with_name(archive_file.name + ".tmp")
+        with gzip.open(rewritten, "wt", encoding="utf-8") as archive_stream:
+            for event in events:
+                archive_stream.write(json.dumps(event, separators=(",", ":")) + "\n")
+        rewritten.replace(archive_file)
+        return changed
+
+    async def forget_member(self, member_id: int, anonymize_creator: bool = True) -> int:
+        """
+        Remove a member from every archived event. Returns the number of events changed.
+
+        This is the only time an archive file is rewritten.
+        """
+        changed = 0
+        for archive_file in self.path.glob("*.jsonl.gz"):
+            guild_id = int(archive_file.name.split(".", 1)[0])
+            async with self._lock(guild_id):
+                changed += await asyncio.get_event_loop().run_in_executor(None, self._forget_member, guild_id, member_id, anonymize_creator)
+        return changed
+
+    def _page(self, guild_id: int, page: int, per_page: int) -> Tuple[List[dict], int]:
+        newest = deque(maxlen=page * per_page)
+        total = 0
+        for event in self.iter_events(guild_id):
+            newest.append(event)
+            total += 1
+
+        newest = list(newest)
+        newest.reverse()
+        return newest[(page - 1) * per_page:page * per_page], total
+
+    async def page(self, guild_id: int, page: int = 1, per_page: int = 10) -> Tuple[List[dict], int]:
+        """
+        One page of archived events, newest first, and the total number of archived events.
+
+        Only `page * per_page` events are held in memory while streaming the archive.
+        """
+        async with self._lock(guild_id):
+            return await asyncio.get_event_loop().run_in_executor(None, self._page, guild_id, page, per_page)
@@ -0,0 +1,72 @@
+import time
+from typing import Dict, Iterator, Tuple
+
+# Seconds between checks for digests that are due
+DIGEST_CHECK_DELAY = 30
+# Seconds the pending digests get to go out when the cog unloads
+DIGEST_FLUSH_TIMEOUT = 30
+
+
+class NotificationDigests:
+    """
+    Sign in and sign out changes waiting to be sent to event creators as one DM.
+
+    Changes are kept per creator and per event. A member that signs in and out again within
+    the same digest cancels out. A creator's digest is due one interval after its first change.
+    """
+
+    def __init__(self):
+        # (guild id, creator id) -> [due, {post id: {"name": str, "changes": {member id: (kind, mention)}}}]
+        self._pending: Dict[Tuple[int, int], list] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, guild_id: int, creator_id: int, event: dict, member_id: int, mention: str, typeOfNotification: str, interval: int) -> None:
+        key = (guild_id, creator_id)
+        if key not in self._pending:
+            self._pending[key] = [time.monotonic() + interval * 60, {}]
+        events = self._pending[key][1]
+        event_changes = events.setdefault(str(event["post_id"]), {"name": event["event_name"], "changes": {}})
+        event_changes["name"] = event["event_name"]
+
+        changes = event_changes["changes"]
+        previous = changes.get(str(member_id))
+        if previous is not None and previous[0] != typeOfNotification:
+            del changes[str(member_id)]
+        else:
+            changes[str(member_id)] = (typeOfNotification, mention)
+
+    def forget_member(self, member_id: int) -> None:
+        """Drop the pending digests of a creator and the changes of a member"""
+        for key in list(self._pending):
+            if key[1] == int(member_id):
+                del self._pending[key]
+                continue
+            for event_changes in self._pending[key][1].values():
+                event_changes["changes"].pop(str(member_id), None)
+
+    def pop_due(self, force: bool = False) -> Iterator[Tuple[int, int, dict]]:
+        """Remove and yield the digests that are due as (guild id, creator id, events)"""
+        now = time.monotonic()
+        for key in [key for key, (due, _) in self._pending.items() if force or due <= now]:
+            events = self._pending.pop(key)[1]
+            guild_id, creator_id = key
+            yield guild_id, creator_id, events
+
+
+def format_digest(events: dict) -> str:
+    """Digest DM text, empty when all changes cancelled out"""
+    digest_str = ""
+    for event in events.values():
+        signins = [mention for kind, mention in event["changes"].values() if kind == "signin"]
+        signouts = [mention for kind, mention in event["changes"].values() if kind == "signout"]
+        if len(signins) == 0 and len(signouts) == 0:
+            continue
+
+        digest_str += f"**{event['name']}**\n"
+        if len(signins) > 0:
+            digest_str += f"Signed up ({len(signins)}): {', '.join(signins)}\n"
+        if len(signouts) > 0:
+            digest_str += f"Signed out ({len(signouts)}): {', '.join(signouts)}\n"
+    return digest_str
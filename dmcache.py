@@ -0,0 +1,82 @@
+import time
+from collections import Counter, OrderedDict
+from typing import Optional
+
+import discord
+
+# DM channels kept around, least recently used go first
+MAX_DM_CHANNELS = 1000
+# Seconds a user with closed DMs is left alone before trying again
+CLOSED_DM_TTL = 6 * 3600
+
+
+class DMChannelCache:
+    """
+    Bounded LRU of DM channels, with a negative cache of users whose DMs are closed.
+
+    Users that refused a DM are skipped without an API call until their entry expires.
+    """
+
+    def __init__(self, max_channels: int = MAX_DM_CHANNELS, closed_ttl: float = CLOSED_DM_TTL):
+        self.max_channels = max_channels
+        self.closed_ttl = closed_ttl
+        self.metrics = Counter()
+        self._channels: "OrderedDict[int, discord.DMChannel]" = OrderedDict()
+        self._closed = {}
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    @property
+    def closed_count(self) -> int:
+        return len(self._closed)
+
+    def is_closed(self, user_id: int) -> bool:
+        expires = self._closed.get(user_id)
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            del self._closed[user_id]
+            return False
+        return True
+
+    def mark_closed(self, user_id: int) -> None:
+        self._closed[user_id] = time.monotonic() + self.closed_ttl
+        self._channels.pop(user_id, None)
+
+    async def get_channel(self, user: discord.abc.User) -> discord.DMChannel:
+        channel = self._channels.get(user.id)
+        if channel is not None:
+            self._channels.move_to_end(user.id)
+            self.metrics["dm_channel_hits"] += 1
+            return channel
+
+        channel = user.dm_channel
+        if channel is None:
+            channel = await user.create_dm()
+            self.metrics["dm_channels_created"] += 1
+        self._channels[user.id] = channel
+        if len(self._channels) > self.max_channels:
+            self._channels.popitem(last=False)
+        return channel
+
+    async def send(self, user: discord.abc.User, *args, **kwargs) -> Optional[discord.Message]:
+        """Send a DM, returns `None` when the user doesn't accept DMs from the bot"""
+        if self.is_closed(user.id):
+            self.metrics["dm_skipped_closed"] += 1
+            return None
+
+        channel = await self.get_channel(user)
+        try:
+            message = await channel.send(*args, **kwargs)
+        except discord.Forbidden:
+            self.mark_closed(user.id)
+            self.metrics["dm_forbidden"] += 1
+            return None
+        self.metrics["dm_sent"] += 1
+        return message
+
+    def purge_expired(self) -> None:
+        now = time.monotonic()
+        for user_id in [user_id for user_id, expires in self._closed.items() if expires <= now]:
+            del self._closed[user_id]
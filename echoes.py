@@ -0,0 +1,57 @@
+import time
+from typing import Dict, List, Tuple
+
+# Seconds to wait for Discord to echo a removal before giving up on it
+ECHO_TTL = 60
+
+
+class ReactionEchoes:
+    """
+    Reaction removals made by the bot, so their echoed remove events can be told apart from members.
+
+    Entries expire, a removal that never echoes doesn't swallow a later one by the member.
+    """
+
+    def __init__(self, ttl: float = ECHO_TTL):
+        self.ttl = ttl
+        self._expected: Dict[Tuple[int, int, str], List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._expected)
+
+    def expect(self, message_id: int, user_id: int, emoji) -> None:
+        self._expected.setdefault((message_id, user_id, str(emoji)), []).append(time.monotonic() + self.ttl)
+
+    def cancel(self, message_id: int, user_id: int, emoji) -> None:
+        """The removal failed, no echo is coming"""
+        key = (message_id, user_id, str(emoji))
+        expiries = self._expected.get(key)
+        if expiries:
+            expiries.pop()
+            if len(expiries) == 0:
+                del self._expected[key]
+
+    def consume(self, message_id: int, user_id: int, emoji) -> bool:
+        """Whether the remove event is the echo of a removal by the bot"""
+        key = (message_id, user_id, str(emoji))
+        expiries = self._expected.get(key)
+        if expiries is None:
+            return False
+        now = time.monotonic()
+        while len(expiries) > 0 and expiries[0] <= now:
+            expiries.pop(0)
+        found = len(expiries) > 0
+        if found:
+            expiries.pop(0)
+        if len(expiries) == 0:
+            del self._expected[key]
+        return found
+
+    def purge_expired(self) -> None:
+        now = time.monotonic()
+        for key in list(self._expected):
+            expiries = [expires for expires in self._expected[key] if expires > now]
+            if len(expiries) == 0:
+                del self._expected[key]
+            else:
+                self._expected[key] = expiries
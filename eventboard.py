@@ -1,25 +1,79 @@
 import logging
-from typing import Literal, Optional, Union
+import json
+from collections import Counter
+from typing import List, Literal, Optional, Tuple, Union
 import copy
 
 import re
 
 import contextlib
+import io
+import time
+import tempfile
 from datetime import datetime as dt, timezone, timedelta
 
 import discord
 from redbot import VersionInfo, version_info
 from redbot.core import Config, VersionInfo, checks, commands, version_info
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.chat_formatting import humanize_list, pagify
-from redbot.core.utils.menus import start_adding_reactions
+from redbot.core.utils.menus import start_adding_reactions, menu, DEFAULT_CONTROLS
 from redbot.core.utils.predicates import ReactionPredicate
+from discord.ext.commands.errors import BadArgument
 
 from .helpers import (
     get_event_embed,
     create_event_reactions,
     valid_image,
+    new_event,
+    validate_title,
+    validate_description,
+    validate_max_attendees,
+    parse_event_start,
+    validate_image,
     get_mentionable_role,
-    get_role_mention
+    get_role_mention,
+    render_member_list,
+    resolve_member_names,
+    forget_member
+)
+from .archive import EventArchive
+from .wizard import WizardSessions
+from .ical import build_calendar, build_vevent
+from .export import EXPORT_FORMATS, collect_member_ids, write_export
+from .importer import PUBLISH_PACE, import_format, iter_import_rows
+from .storage import ConfigEventStore, SQLiteEventStore, migrate_events
+from .settings import GuildSettings, migrate_reminder_settings
+from .digest import DIGEST_CHECK_DELAY, DIGEST_FLUSH_TIMEOUT, NotificationDigests, format_digest
+from .dmcache import DMChannelCache
+from .echoes import ReactionEchoes
+from .eventcache import EventCache
+from .ids import EventIdAllocator
+from .memberindex import MemberIndexes
+from .roleindex import RoleIndexes
+from .scheduler import (
+    OutboundScheduler,
+    PRIORITY_POST,
+    PRIORITY_REACTION,
+    PRIORITY_REMINDER,
+    PRIORITY_NOTIFICATION,
+    PRIORITY_MODERATION
+)
+from .sharding import shard_for_guild
+from .stats import NOSHOW_WINDOW, new_member_stats, new_guild_stats, attendance_rate, fill_rate, average_fill_rate
+from .replay import TrafficRecorder, forget_member_recordings, replay_recording, serialize_member
+from .reminders import (
+    describe_reminder_schedule,
+    due_stages,
+    event_reminder_schedule,
+    next_stage,
+    parse_reminder_schedule,
+    passed_stages
+)
+from .recurrence import (
+    parse_recurrence,
+    describe_recurrence,
+    next_occurrence_after
 )
 
 import asyncio
@@ -43,27 +97,116 @@ class Eventboard(commands.Cog):
             "auto_end_events": False,
             "autodelete": 60,
             "reminder": -1,
+            "reminders": None,
             "mentions": {},
             "mention_all": 1,
             "notifications_signin": {},
             "notifications_signout": {},
-            "notifications_eventstart": {}
+            "notifications_eventstart": {},
+            "notifications_digest": {},
+            "series": {},
+            "stats": new_guild_stats()
         }
         default_user = {"player_class": ""}
+        default_global = {"storage_backend": "config"}
         self.config.register_guild(**default_guild)
         self.config.register_member(**default_user)
-        self.event_cache = {}
+        self.config.register_global(**default_global)
+        self.event_cache = EventCache(lambda guild: self.store.load_events(guild))
+        self.stats_cache = {}
+        self.wizards = WizardSessions()
+        self.import_tasks = set()
+        self.calendar_cache = {}
+        self.settings_cache = {}
+        self.post_fingerprints = {}
+        self.maintenance_cursors = {}
+        self.metrics = Counter()
+        self.scheduler = OutboundScheduler()
+        self.dm_cache = DMChannelCache()
+        self.digests = NotificationDigests()
+        self.event_ids = EventIdAllocator(self.config)
+        self.recorder = TrafficRecorder()
+        self.member_indexes = MemberIndexes()
+        self.role_indexes = RoleIndexes()
+        self.reaction_echoes = ReactionEchoes()
+        self.archive = EventArchive(cog_data_path(self) / "archive")
+        self.store = ConfigEventStore(self.config)
+        self.storage_ready = asyncio.Event()
         self.event_init_task = self.bot.loop.create_task(self.initialize())
         self.event_maintenance = self.bot.loop.create_task(self.maintenance_events())
+        self.digest_task = self.bot.loop.create_task(self.send_digests())
 
-        self.reactionEmoji = {"attending": "✅", "declined": "❌", "maybe": "❔"}
+        self.reactionEmoji = {"attending": "✅", "declined": "❌", "maybe": "❔", "waitlist": "✅"}
 
     def cog_unload(self):
         self.event_init_task.cancel()
         self.event_maintenance.cancel()
+        self.digest_task.cancel()
+        self.wizards.cancel_all()
+        self.recorder.stop()
+        self.bot.loop.create_task(self.flush_outbound())
+        for task in self.import_tasks:
+            task.cancel()
+        self.bot.loop.create_task(self.store.close())
+
+    async def red_delete_data_for_user(self, *, requester: Literal["discord_deleted_user", "owner", "user", "user_strict"], user_id: int) -> None:
+        """
+        Remove a user from the events, archive, statistics, notification settings and recordings.
+
+        Events a user created stay on the board. Their creator is only cleared for deleted accounts and strict requests,
+        the creator decides who may edit or delete an event.
+        """
+        anonymize_creator = requester in ("discord_deleted_user", "user_strict")
+        await self.storage_ready.wait()
+
+        for guild_id, guild_data in (await self.config.all_guilds()).items():
+            guild = discord.Object(id=int(guild_id))
+            guild_config = self.config.guild(guild)
+            await self.config.member_from_ids(int(guild_id), user_id).clear()
+            for key in ("notifications_signin", "notifications_signout", "notifications_eventstart", "notifications_digest"):
+                if str(user_id) in guild_data.get(key, {}):
+                    await guild_config.get_attr(key).clear_raw(str(user_id))
+            if str(user_id) in guild_data.get("stats", {}).get("members", {}):
+                await guild_config.stats.clear_raw("members", str(user_id))
+            if anonymize_creator:
+                for series_id, series in guild_data.get("series", {}).items():
+                    if series.get("creator") == user_id:
+                        await guild_config.series.set_raw(series_id, "creator", value=0)
+            self.stats_cache.pop(int(guild_id), None)
+            self.invalidate_guild_settings(guild)
+
+            data = await self.store.load_events(guild)
+            events = self.event_cache.view(int(guild_id), data)
+            changed = [event for event in events.values() if forget_member(event, user_id, anonymize_creator)]
+            for event in changed:
+                self.event_cache.refresh(int(guild_id), event)
+            if len(changed) > 0:
+                await self.store.save_events(guild, changed)
+
+        await self.archive.forget_member(user_id, anonymize_creator)
+        self.digests.forget_member(user_id)
+
+        # Recordings are debugging captures, the ones with the user are deleted whole
+        await self.bot.loop.run_in_executor(None, forget_member_recordings, cog_data_path(self) / "recordings", user_id)
+        if self.recorder.recording and not self.recorder.path.exists():
+            self.recorder.stop()
+
+    def get_store(self, backend: str):
+        if backend == "sqlite":
+            return SQLiteEventStore(cog_data_path(self) / "events.sqlite3")
+        return ConfigEventStore(self.config)
 
     async def initialize(self) -> None:
         CHECK_DELAY = 300
+        backend = await self.config.storage_backend()
+        if backend != self.store.name:
+            self.store = self.get_store(backend)
+        migrated = await migrate_reminder_settings(self.config)
+        if migrated != 0:
+            log.info(f"Migrated the reminder setting of {migrated} guilds to reminder schedules")
+        self.storage_ready.set()
+        self.scheduler.start()
+
         while self == self.bot.get_cog("Eventboard"):
             log.debug("Running Event Init")
             if version_info >= VersionInfo.from_str("3.2.0"):
@@ -71,25 +214,17 @@ class Eventboard(commands.Cog):
             else:
                 await self.bot.wait_until_ready()
             try:
+                # Events are loaded on first access, idle guilds are dropped again
                 for guild_id in await self.config.all_guilds():
-                    guild = self.bot.get_guild(int(guild_id))
-                    if guild_id not in self.event_cache:
-                        self.event_cache[guild_id] = {}
-                    if guild is None:
-                        continue
-                    data = await self.config.guild(guild).events()
-                    for post_id, event_data in data.items():
-                        try:
-                            event = event_data
-                        except (TypeError, KeyError, discord.errors.Forbidden):
-                            log.error("Error loading events", exc_info=True)
-                            continue
-                        if event is None:
-                            return
-                        self.event_cache[guild_id][post_id] = event
+                    self.event_cache.register(guild_id)
+                evicted = self.event_cache.sweep()
+                if evicted["cold"] != 0 or evicted["hot"] != 0:
+                    log.debug(f"Evicted {evicted['cold']} guilds from the cold tier and {evicted['hot']} idle guilds")
             except Exception as e:
                 log.error("Error loading events", exc_info=e)
 
+            self.dm_cache.purge_expired()
+            self.reaction_echoes.purge_expired()
             log.debug("Ended Event Init")
             await asyncio.sleep(CHECK_DELAY)
 
@@ -131,13 +266,7 @@ class Eventboard(commands.Cog):
         author = ctx.author
         guild = ctx.guild
 
-        if author.dm_channel is None:
-            dmchannel = await author.create_dm()
-        else:
-            dmchannel = author.dm_channel
-
-        def same_author_check_dm(msg):
-            return msg.author == author and msg.channel == dmchannel
+        dmchannel = await self.dm_cache.get_channel(author)
 
         await ctx.message.delete(delay=10)
 
@@ -153,7 +282,7 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Select the event your like to add a attendant to", description=f"Enter the number of the list. Type `None` to cancel.\n\n{event_str}", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
@@ -177,38 +306,33 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Who would you like to add", description=f"Please enter the nickname or discord name of the member you would like to add.", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
         else:
-            member_name = msg.content
-            member = guild.get_member_named(member_name)
-
+            member = await self.select_member(guild, author, dmchannel, msg.content)
             if member is None:
-                embed=discord.Embed(title="Error", description="I can't find anyone with that name", color=0xff0000)
-                await dmchannel.send(embed=embed)
                 return
 
-            async with self.config.guild(guild).events() as events_list:
-                event = self.event_cache[guild.id][str(selected_event["post_id"])]
-                num_addending = len(event['attending'])
-                if int(event["max_attendees"]) <= int(num_addending) and int(event["max_attendees"]) != 0:
-                    await dmchannel.send(f"Sorry, this event is full.", delete_after=30)
-                    return
-                
-                await dmchannel.send(f"Adding {member.mention}")
-                self.event_cache[guild.id][str(selected_event["post_id"])]["attending"][member.id] = member.id
-                updated_event = self.event_cache[guild.id][str(selected_event["post_id"])]
-                events_list[str(selected_event["post_id"])] = updated_event
+            events = await self.event_cache.load(guild)
+            event = events[str(selected_event["post_id"])]
+            num_addending = len(event['attending'])
+            if int(event["max_attendees"]) <= int(num_addending) and int(event["max_attendees"]) != 0:
+                await dmchannel.send(f"Sorry, this event is full.", delete_after=30)
+                return
+
+            await dmchannel.send(f"Adding {member.mention}")
+            events[str(selected_event["post_id"])]["attending"][str(member.id)] = str(member.id)
+            updated_event = events[str(selected_event["post_id"])]
+            await self.store.save_attendance(guild, updated_event, member.id)
+            await self.record_signin(guild, updated_event, member.id)
             
             message = await self.get_event_post(guild, updated_event["post_id"])
             if message is None:
                 return
 
-            embed = get_event_embed(guild=guild,event=updated_event)
-            mention = get_role_mention(guild, updated_event)
-            await message.edit(content=mention, embed=embed, suppress=False)
+            await self.update_event_post(guild, message, updated_event)
 
     @eventboard_manage.command("removeattending")
     @commands.guild_only()
@@ -217,13 +341,7 @@ class Eventboard(commands.Cog):
         author = ctx.author
         guild = ctx.guild
 
-        if author.dm_channel is None:
-            dmchannel = await author.create_dm()
-        else:
-            dmchannel = author.dm_channel
-
-        def same_author_check_dm(msg):
-            return msg.author == author and msg.channel == dmchannel
+        dmchannel = await self.dm_cache.get_channel(author)
 
         await ctx.message.delete(delay=10)
 
@@ -239,7 +357,7 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Select the event your like to add a attendant to", description=f"Enter the number of the list. Type `None` to cancel.\n\n{event_str}", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
@@ -263,37 +381,267 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Who would you like to remove", description=f"Please enter the nickname or discord name of the member you would like to add.", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
         else:
-            member_name = msg.content
-            member = guild.get_member_named(member_name)
-
+            member = await self.select_member(guild, author, dmchannel, msg.content)
             if member is None:
-                embed=discord.Embed(title="Error", description="I can't find anyone with that name", color=0xff0000)
-                await dmchannel.send(embed=embed)
                 return
 
-            if member.id in self.event_cache[guild.id][str(selected_event["post_id"])]["attending"] is False:
+            events = await self.event_cache.load(guild)
+            if str(member.id) not in events[str(selected_event["post_id"])]["attending"]:
                 embed=discord.Embed(title="Error", description=f"{member.mention} isn't signed up for the event", color=0xff0000)
                 await dmchannel.send(embed=embed)
                 return
 
-            async with self.config.guild(guild).events() as events_list:                
-                await dmchannel.send(f"Removing {member.mention}")
-                del self.event_cache[guild.id][str(selected_event["post_id"])]["attending"][str(member.id)]
-                updated_event = self.event_cache[guild.id][str(selected_event["post_id"])]
-                events_list[str(selected_event["post_id"])] = updated_event
+            await dmchannel.send(f"Removing {member.mention}")
+            del events[str(selected_event["post_id"])]["attending"][str(member.id)]
+            updated_event = events[str(selected_event["post_id"])]
+            await self.store.save_attendance(guild, updated_event, member.id)
+            await self.record_signout(guild, updated_event, member.id)
+            await self.promote_waitlist(guild, updated_event)
             
             message = await self.get_event_post(guild, updated_event["post_id"])
             if message is None:
                 return
 
-            embed = get_event_embed(guild=guild,event=updated_event)
-            mention = get_role_mention(guild, updated_event)
-            await message.edit(content=mention, embed=embed, suppress=False)
+            await self.update_event_post(guild, message, updated_event)
+
+    @eventboard.command(name="history")
+    @commands.guild_only()
+    async def eventboard_history(self, ctx: commands.Context, page: int = 1):
+        """
+        List finished events
+
+        `{page}` the page of the history to show, newest events first
+        """
+        per_page = 10
+        if page < 1:
+            page = 1
+
+        events, total = await self.archive.page(ctx.guild.id, page=page, per_page=per_page)
+        pages = max(1, -(-total // per_page))
+        if len(events) == 0:
+            history_str = "There are no finished events on this page."
+        else:
+            history_str = ""
+            for event in events:
+                starttime_str = dt.fromtimestamp(event["event_start"]).strftime("%a %d %b %Y at %H:%M")
+                event_fill = fill_rate(event)
+                fill_str = "" if event_fill is None else f" ({event_fill:.0%} full)"
+                history_str += f"**{event['id']}. {event['event_name']}**\n{starttime_str} - {len(event['attending'])} attended{fill_str}\n"
+
+        emb = discord.Embed(title="Finished events", description=history_str, color=0xffff00)
+        emb.set_footer(text=f"Page {page} of {pages}")
+        await ctx.channel.send(embed=emb)
+
+    @eventboard.command(name="reminders")
+    @commands.guild_only()
+    async def eventboard_reminders(self, ctx: commands.Context, event_id: int, *, schedule: str = None):
+        """
+        Show or change the reminders of an event
+
+        `{event_id}` the number of the event
+        `{schedule}` the times before the event starts, like `24h 1h 0`. Set to `none` for no reminders or `default` to use the server's reminders
+        """
+        guild = ctx.guild
+        await ctx.message.delete(delay=30)
+        event = None
+        for cached_event in (await self.event_cache.load(guild)).values():
+            if int(cached_event["id"]) == event_id:
+                event = cached_event
+                break
+
+        if event is None:
+            await ctx.send("I can't find that event", delete_after=15)
+            return
+
+        settings = await self.get_guild_settings(guild)
+        if schedule is None:
+            stages = event_reminder_schedule(event, settings.reminders)
+            upcoming = next_stage(stages, int(event["remindersent"]))
+            reminders_str = describe_reminder_schedule(stages)
+            if "reminders" not in event:
+                reminders_str += " (server default)"
+            if upcoming is not None:
+                reminders_str += f"\nThe next reminder is sent {describe_reminder_schedule([upcoming])}"
+            await ctx.send(f"**{event['event_name']}**: {reminders_str}", delete_after=60)
+            return
+
+        if event["creator"] != ctx.author.id and not await self.is_mod_or_admin(ctx.author):
+            await ctx.send("That event isn't yours to change", delete_after=15)
+            return
+
+        if schedule.strip().lower() == "default":
+            stages = settings.reminders
+            fields = {}
+            event.pop("reminders", None)
+        else:
+            try:
+                stages = parse_reminder_schedule(schedule)
+            except BadArgument as e:
+                await ctx.send(str(e), delete_after=30)
+                return
+            fields = {"reminders": stages}
+
+        # Reminders whose time already passed aren't sent afterwards
+        fields["remindersent"] = passed_stages(stages, event["event_start"], (dt.now()).timestamp())
+        await self.update_event_fields(guild, event["post_id"], **fields)
+        await ctx.send(f"**{event['event_name']}**: {describe_reminder_schedule(stages)}", delete_after=30)
+
+    @eventboard.command(name="attendees")
+    @commands.guild_only()
+    async def eventboard_attendees(self, ctx: commands.Context, event_id: int):
+        """
+        Show the full list of members that responded to an event
+
+        `{event_id}` the number of the event
+        """
+        guild = ctx.guild
+        event = None
+        for cached_event in (await self.event_cache.load(guild)).values():
+            if int(cached_event["id"]) == event_id:
+                event = cached_event
+                break
+
+        if event is None:
+            await ctx.send("I can't find that event", delete_after=15)
+            return
+
+        per_page = 20
+        sections = [(":white_check_mark: Accepted", event["attending"]), (":grey_question: Tentative", event["maybe"]), (":x: Declined", event["declined"])]
+        pages = []
+        for section_name, members in sections:
+            member_ids = list(members)
+            for start in range(0, max(len(member_ids), 1), per_page):
+                member_str = render_member_list(guild, member_ids[start:start + per_page])
+                emb = discord.Embed(title=event["event_name"], color=0xffff00)
+                emb.add_field(name=f"{section_name} ({len(member_ids)})", value=member_str, inline=False)
+                pages.append(emb)
+
+        for i, emb in enumerate(pages, start=1):
+            emb.set_footer(text=f"Page {i} of {len(pages)}")
+        await menu(ctx, pages, DEFAULT_CONTROLS)
+
+    @eventboard.command(name="calendar")
+    @commands.guild_only()
+    async def eventboard_calendar(self, ctx: commands.Context):
+        """
+        Get the upcoming events as calendar file
+
+        The file can be imported in most calendar apps.
+        """
+        guild = ctx.guild
+        await ctx.message.delete(delay=10)
+        calendar = await self.get_guild_calendar(guild)
+        await ctx.send(file=discord.File(io.BytesIO(calendar), filename=f"{guild.name}-events.ics"), delete_after=300)
+
+    async def get_guild_calendar(self, guild: discord.Guild) -> bytes:
+        """
+        ICS file of the upcoming events of a guild.
+
+        Every event is rendered once per revision and the whole file is only rebuilt when an event was added, removed or changed.
+        """
+        cached = self.calendar_cache.setdefault(guild.id, {"events": {}, "key": None, "ics": None})
+        event_channel = await self.config.guild(guild).event_channel()
+        now = (dt.now()).timestamp()
+
+        upcoming = []
+        for post_id, event in (await self.event_cache.load(guild)).items():
+            if event["event_start"] >= now:
+                upcoming.append((event["event_start"], post_id, event))
+        upcoming.sort(key=lambda item: item[0])
+
+        key = tuple((post_id, event.get("revision", 0)) for event_start, post_id, event in upcoming)
+        if key == cached["key"]:
+            return cached["ics"]
+
+        vevents = {}
+        for event_start, post_id, event in upcoming:
+            revision = event.get("revision", 0)
+            cached_event = cached["events"].get(post_id)
+            if cached_event is not None and cached_event[0] == revision:
+                vevents[post_id] = cached_event
+                continue
+            url = None
+            if event_channel is not None:
+                url = f"https://discord.com/channels/{guild.id}/{event_channel}/{post_id}"
+            vevents[post_id] = (revision, build_vevent(guild.id, event, url))
+
+        cached["events"] = vevents
+        cached["key"] = key
+        cached["ics"] = build_calendar(f"{guild.name} events", (vevents[post_id][1] for event_start, post_id, event in upcoming))
+        return cached["ics"]
+
+    @eventboard.command(name="export")
+    @commands.guild_only()
+    async def eventboard_export(self, ctx: commands.Context, export_format: str = "csv"):
+        """
+        Export events and their attendees
+
+        `{export_format}` either `csv` or `jsonl`
+        """
+        guild = ctx.guild
+        export_format = export_format.lower()
+        if not await self.is_mod_or_admin(ctx.author):
+            await ctx.send("You are not allowed to export events", delete_after=15)
+            return
+        if export_format not in EXPORT_FORMATS:
+            await ctx.send("The export format must be either `csv` or `jsonl`", delete_after=15)
+            return
+
+        live_events = copy.deepcopy(list((await self.event_cache.load(guild)).values()))
+
+        def events():
+            yield from self.archive.iter_events(guild.id)
+            yield from live_events
+
+        loop = asyncio.get_event_loop()
+        async with ctx.typing():
+            member_ids = await loop.run_in_executor(None, collect_member_ids, events())
+            names = resolve_member_names(guild, member_ids)
+
+            with tempfile.TemporaryFile() as fp:
+                rows = await loop.run_in_executor(None, write_export, fp, events, names, export_format)
+                if fp.tell() > guild.filesize_limit:
+                    await ctx.send("The export is too large to upload", delete_after=15)
+                    return
+                fp.seek(0)
+                await ctx.send(f"Exported {rows} rows", file=discord.File(fp, filename=f"events-{guild.id}.{export_format}"))
+
+    @eventboard.command(name="stats")
+    @commands.guild_only()
+    async def eventboard_stats(self, ctx: commands.Context, member: discord.Member = None):
+        """
+        Show attendance statistics
+
+        `{member}` the member to show the statistics of. Shows the server statistics if left out.
+        """
+        stats = await self.get_stats(ctx.guild)
+
+        if member is None:
+            guild_stats = stats["events"]
+            average_fill = average_fill_rate(stats)
+            average_fill_str = "-" if average_fill is None else f"{average_fill:.0%}"
+            emb = discord.Embed(title=f"Event statistics of {ctx.guild.name}", color=0xffff00)
+            emb.add_field(name="Finished events", value=str(guild_stats["finished"]), inline=True)
+            emb.add_field(name="Attendees", value=str(guild_stats["attended"]), inline=True)
+            emb.add_field(name="Average fill rate", value=average_fill_str, inline=True)
+            await ctx.channel.send(embed=emb)
+            return
+
+        member_stats = stats["members"].get(str(member.id), new_member_stats())
+        rate = attendance_rate(member_stats)
+        rate_str = "-" if rate is None else f"{rate:.0%}"
+        emb = discord.Embed(title=f"Event statistics of {member.display_name}", color=0xffff00)
+        emb.add_field(name="Sign ups", value=str(member_stats["signups"]), inline=True)
+        emb.add_field(name="Attended", value=str(member_stats["attended"]), inline=True)
+        emb.add_field(name="Attendance rate", value=rate_str, inline=True)
+        emb.add_field(name="Sign outs", value=str(member_stats["signouts"]), inline=True)
+        emb.add_field(name="No-shows", value=str(member_stats["noshows"]), inline=True)
+        await ctx.channel.send(embed=emb)
 
     @eventboard.group(name="notifications")
     @commands.guild_only()
@@ -322,6 +670,7 @@ class Eventboard(commands.Cog):
         
         eventstart[str(author.id)] = new_value
         await self.config.guild(ctx.guild).notifications_eventstart.set(eventstart)
+        self.invalidate_guild_settings(ctx.guild)
         if new_value == 0:
             await ctx.channel.send("You will no longer receive a notification before an event starts", delete_after=15)
         else:
@@ -347,6 +696,7 @@ class Eventboard(commands.Cog):
         
         signin[str(author.id)] = new_value
         await self.config.guild(ctx.guild).notifications_signin.set(signin)
+        self.invalidate_guild_settings(ctx.guild)
         if new_value == 0:
             await ctx.channel.send("You will no longer receive a notification when someone signs in for your event", delete_after=15)
         else:
@@ -372,11 +722,31 @@ class Eventboard(commands.Cog):
         
         signout[str(author.id)] = new_value
         await self.config.guild(ctx.guild).notifications_signout.set(signout)
+        self.invalidate_guild_settings(ctx.guild)
         if new_value == 0:
             await ctx.channel.send("You will no longer receive a notification when someone signs out for your event", delete_after=15)
         else:
             await ctx.channel.send("You will receive a notification when someone signs out for your event", delete_after=15)
 
+    @eventboard_notifications.command("digest")
+    @commands.guild_only()
+    async def eventboard_notifications_digest(self, ctx: commands.Context, minutes: int):
+        """{minutes} Bundle sign in and sign out notifications into one message every x minutes. 0 for a message per change"""
+
+        author = ctx.author
+        await ctx.message.delete(delay=5)
+
+        if minutes < 0:
+            await ctx.channel.send("The interval can't be negative", delete_after=15)
+            return
+
+        await self.config.guild(ctx.guild).notifications_digest.set_raw(str(author.id), value=minutes)
+        self.invalidate_guild_settings(ctx.guild)
+        if minutes == 0:
+            await ctx.channel.send("You will receive a notification for every sign in and sign out", delete_after=15)
+        else:
+            await ctx.channel.send(f"You will receive a summary of sign ins and sign outs every {minutes} minutes", delete_after=15)
+
     @eventboard.group(name="edit")
     @commands.guild_only()
     async def eventboard_manage_edit(self, ctx: commands.Context):
@@ -390,13 +760,7 @@ class Eventboard(commands.Cog):
         author = ctx.author
         guild = ctx.guild
 
-        if author.dm_channel is None:
-            dmchannel = await author.create_dm()
-        else:
-            dmchannel = author.dm_channel
-
-        def same_author_check_dm(msg):
-            return msg.author == author and msg.channel == dmchannel
+        dmchannel = await self.dm_cache.get_channel(author)
 
         await ctx.message.delete(delay=10)
 
@@ -412,7 +776,7 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Select the event your like to edit the title of.", description=f"Enter the number of the list. Type `None` to cancel.\n\n{event_str}", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
@@ -436,7 +800,7 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="What do you like your new event title to be?", description=f"Up to 200 characters are permitted.", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
@@ -447,19 +811,14 @@ class Eventboard(commands.Cog):
                 await dmchannel.send(embed=embed)
                 return
 
-            async with self.config.guild(guild).events() as events_list:                
-                await dmchannel.send(f"Changing event title")
-                self.event_cache[guild.id][str(selected_event["post_id"])]["event_name"] = new_title
-                updated_event = self.event_cache[guild.id][str(selected_event["post_id"])]
-                events_list[str(selected_event["post_id"])] = updated_event
+            await dmchannel.send(f"Changing event title")
+            updated_event = await self.update_event_fields(guild, selected_event["post_id"], event_name=new_title)
             
             message = await self.get_event_post(guild, updated_event["post_id"])
             if message is None:
                 return
 
-            embed = get_event_embed(guild=guild,event=updated_event)
-            mention = get_role_mention(guild, updated_event)
-            await message.edit(content=mention, embed=embed, suppress=False)
+            await self.update_event_post(guild, message, updated_event)
 
     @eventboard_manage_edit.command("description")
     @commands.guild_only()
@@ -468,13 +827,7 @@ class Eventboard(commands.Cog):
         author = ctx.author
         guild = ctx.guild
 
-        if author.dm_channel is None:
-            dmchannel = await author.create_dm()
-        else:
-            dmchannel = author.dm_channel
-
-        def same_author_check_dm(msg):
-            return msg.author == author and msg.channel == dmchannel
+        dmchannel = await self.dm_cache.get_channel(author)
 
         await ctx.message.delete(delay=10)
 
@@ -490,7 +843,7 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Select the event your like to edit the title of.", description=f"Enter the number of the list. Type `None` to cancel.\n\n{event_str}", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
@@ -514,7 +867,7 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="What do you like your new event description to be?", description=f"Up to 1600 characters are permitted.", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
@@ -523,19 +876,14 @@ class Eventboard(commands.Cog):
             if new_description.lower() == "none":
                 new_description = None
 
-            async with self.config.guild(guild).events() as events_list:                
-                await dmchannel.send(f"Changing event description")
-                self.event_cache[guild.id][str(selected_event["post_id"])]["description"] = new_description
-                updated_event = self.event_cache[guild.id][str(selected_event["post_id"])]
-                events_list[str(selected_event["post_id"])] = updated_event
+            await dmchannel.send(f"Changing event description")
+            updated_event = await self.update_event_fields(guild, selected_event["post_id"], description=new_description)
             
             message = await self.get_event_post(guild, updated_event["post_id"])
             if message is None:
                 return
 
-            embed = get_event_embed(guild=guild,event=updated_event)
-            mention = get_role_mention(guild, updated_event)
-            await message.edit(content=mention, embed=embed, suppress=False)
+            await self.update_event_post(guild, message, updated_event)
 
     @eventboard_manage_edit.command("maxattendees")
     @commands.guild_only()
@@ -544,13 +892,7 @@ class Eventboard(commands.Cog):
         author = ctx.author
         guild = ctx.guild
 
-        if author.dm_channel is None:
-            dmchannel = await author.create_dm()
-        else:
-            dmchannel = author.dm_channel
-
-        def same_author_check_dm(msg):
-            return msg.author == author and msg.channel == dmchannel
+        dmchannel = await self.dm_cache.get_channel(author)
 
         await ctx.message.delete(delay=10)
 
@@ -566,7 +908,7 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Select the event your like to edit the maximum number of attendees of.", description=f"Enter the number of the list. Type `None` to cancel.\n\n{event_str}", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
@@ -590,26 +932,28 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Enter the maximum number of attendees?", description=f"Type `0` for unlimited number of attendees.", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
         else:
-            new_numAttendees = msg.content
+            try:
+                new_numAttendees = validate_max_attendees(msg.content)
+            except BadArgument as e:
+                embed=discord.Embed(title="Error", description=str(e), color=0xff0000)
+                await dmchannel.send(embed=embed)
+                return
 
-            async with self.config.guild(guild).events() as events_list:                
-                await dmchannel.send(f"Changing event max attendees")
-                self.event_cache[guild.id][str(selected_event["post_id"])]["max_attendees"] = new_numAttendees
-                updated_event = self.event_cache[guild.id][str(selected_event["post_id"])]
-                events_list[str(selected_event["post_id"])] = updated_event
+            await dmchannel.send(f"Changing event max attendees")
+            updated_event = await self.update_event_fields(guild, selected_event["post_id"], max_attendees=new_numAttendees)
+            while await self.promote_waitlist(guild, updated_event) is not None:
+                pass
             
             message = await self.get_event_post(guild, updated_event["post_id"])
             if message is None:
                 return
 
-            embed = get_event_embed(guild=guild,event=updated_event)
-            mention = get_role_mention(guild, updated_event)
-            await message.edit(content=mention, embed=embed, suppress=False)
+            await self.update_event_post(guild, message, updated_event)
 
     @eventboard_manage_edit.command("image")
     @commands.guild_only()
@@ -618,13 +962,7 @@ class Eventboard(commands.Cog):
         author = ctx.author
         guild = ctx.guild
 
-        if author.dm_channel is None:
-            dmchannel = await author.create_dm()
-        else:
-            dmchannel = author.dm_channel
-
-        def same_author_check_dm(msg):
-            return msg.author == author and msg.channel == dmchannel
+        dmchannel = await self.dm_cache.get_channel(author)
 
         await ctx.message.delete(delay=10)
 
@@ -640,7 +978,7 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Select the event your like to edit the image of.", description=f"Enter the number of the list. Type `None` to cancel.\n\n{event_str}", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
@@ -664,7 +1002,7 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Enter the URL to the new image.", description=f"Type `None` for no image. Please write an URL of an image. Must be a HTTPS url.", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
@@ -678,19 +1016,14 @@ class Eventboard(commands.Cog):
                     await dmchannel.send(embed=embed)
                     return
 
-            async with self.config.guild(guild).events() as events_list:                
-                await dmchannel.send(f"Changing event image")
-                self.event_cache[guild.id][str(selected_event["post_id"])]["image"] = image
-                updated_event = self.event_cache[guild.id][str(selected_event["post_id"])]
-                events_list[str(selected_event["post_id"])] = updated_event
+            await dmchannel.send(f"Changing event image")
+            updated_event = await self.update_event_fields(guild, selected_event["post_id"], image=image)
             
             message = await self.get_event_post(guild, updated_event["post_id"])
             if message is None:
                 return
 
-            embed = get_event_embed(guild=guild,event=updated_event)
-            mention = get_role_mention(guild, updated_event)
-            await message.edit(content=mention, embed=embed, suppress=False)
+            await self.update_event_post(guild, message, updated_event)
 
     @eventboard.command(name="create")
     #@allowed_to_create()
@@ -704,13 +1037,7 @@ class Eventboard(commands.Cog):
         author = ctx.author
         guild = ctx.guild
 
-        if author.dm_channel is None:
-            dmchannel = await author.create_dm()
-        else:
-            dmchannel = author.dm_channel
-
-        def same_author_check_dm(msg):
-            return msg.author == author and msg.channel == dmchannel
+        dmchannel = await self.dm_cache.get_channel(author)
 
         # Check if event channel is set
         event_channel = await self.config.guild(guild).event_channel()
@@ -720,8 +1047,7 @@ class Eventboard(commands.Cog):
             return
 
         # Get event ID
-        event_id = await self.config.guild(guild).next_available_id()
-        await self.config.guild(ctx.guild).next_available_id.set(event_id+1)
+        event_id = await self.event_ids.allocate(guild)
 
         # Get event creation time
         creation_time = ctx.message.created_at
@@ -734,14 +1060,15 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Enter the event title", description="Up to 200 characters are permitted", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
         else:
-            name = msg.content[0:199]
-            if len(name) <= 3:
-                embed=discord.Embed(title="Error stopping event creation", description="This title is to short. Try again with atleast 3 characters!", color=0xff0000)
+            try:
+                name = validate_title(msg.content)
+            except BadArgument as e:
+                embed=discord.Embed(title="Error stopping event creation", description=str(e), color=0xff0000)
                 await dmchannel.send(embed=embed)
                 return
 
@@ -749,25 +1076,28 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Enter the event description", description="Type `None` for no description. Up to 1600 characters are permitted", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=600)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=600)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
         else:
-            description = msg.content[0:1599]
-            if description.lower() == "none":
-                description = None
+            description = validate_description(msg.content)
             
         # max number of attendees
         embed=discord.Embed(title="Enter the maximum number of attendees", description="Type `0` for unlimited number of attendees.", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
         else:
-            numAttendees = msg.content
+            try:
+                numAttendees = validate_max_attendees(msg.content)
+            except BadArgument as e:
+                embed=discord.Embed(title="Error stopping event creation", description=str(e), color=0xff0000)
+                await dmchannel.send(embed=embed)
+                return
 
         # timezone
 
@@ -775,22 +1105,15 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="When should the event start?", description="Please use `YYYY-MM-DD HH:MM` in 24-hour notation", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
         else:
-            startDateTimeInput = msg.content
-            pattern = re.compile("^[0-9]{4}-(0?[1-9]|1[012])-(0?[1-9]|[12][0-9]|3[01]) (0?[0-9]|1[0-9]|2[0-4]):(0?[0-9]|[1-5][0-9])$")
-            
-            if not pattern.match(startDateTimeInput):
-                embed=discord.Embed(title="Error stopping event creation", description="The date format is not correct!", color=0xff0000)
-                await dmchannel.send(embed=embed)
-                return
-
-            startDateTime = dt.strptime(startDateTimeInput, '%Y-%m-%d %H:%M')
-            if startDateTime < dt.now():
-                embed=discord.Embed(title="Error stopping event creation", description="You can't create an event in the past!", color=0xff0000)
+            try:
+                startDateTime = parse_event_start(msg.content)
+            except BadArgument as e:
+                embed=discord.Embed(title="Error stopping event creation", description=str(e), color=0xff0000)
                 await dmchannel.send(embed=embed)
                 return
 
@@ -798,17 +1121,23 @@ class Eventboard(commands.Cog):
         # duration
 
         # repeating
-
-        # Mentions
-        mention_all = await self.config.guild(guild).mention_all()
-        if mention_all == 1:
-            mentions = {}
-            for role in guild.roles:
-                if role.mentionable == True:
-                    mentions[role.id] = role.id
+        embed=discord.Embed(title="Should this event repeat?", description="Type `None` for a single event. Otherwise use `weekly`, `weekly 2` for every 2 weeks, `every 3 days` or `2nd tuesday` / `last friday` for a day of the month", color=0xffff00)
+        await dmchannel.send(embed=embed)
+        try:
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
+        except asyncio.TimeoutError:
+            await dmchannel.send("I'm not sure where you went. We can try this again later.")
+            return
         else:
-            mentions = await self.config.guild(guild).mentions()
+            recurrence = parse_recurrence(msg.content)
+            if recurrence is False:
+                embed=discord.Embed(title="Error stopping event creation", description="I don't understand how this event should repeat!", color=0xff0000)
+                await dmchannel.send(embed=embed)
+                return
 
+        # Mentions
+        mention = None
+        mentions = await self.get_mention_options(guild)
         if len(mentions) != 0:
             i = 1
             mention_str = ""
@@ -823,7 +1152,7 @@ class Eventboard(commands.Cog):
             embed=discord.Embed(title="Who would you like to mention?", description=f"Type `None` to mention no one. Please type the corrosponding number\n\n {mention_str}", color=0xffff00)
             await dmchannel.send(embed=embed)
             try:
-                msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+                msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
             except asyncio.TimeoutError:
                 await dmchannel.send("I'm not sure where you went. We can try this again later.")
                 return
@@ -848,52 +1177,186 @@ class Eventboard(commands.Cog):
         embed=discord.Embed(title="Would you like to add an event image?", description="Type `None` for no image. Please write an URL of an image. Must be a HTTPS url.", color=0xffff00)
         await dmchannel.send(embed=embed)
         try:
-            msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+            msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
         except asyncio.TimeoutError:
             await dmchannel.send("I'm not sure where you went. We can try this again later.")
             return
         else:
-            image = msg.content
-            if image.lower() == "none":
-                image = None
-            else:    
-                if not await valid_image(image):
-                    embed=discord.Embed(title="Error stopping event creation", description="That URL doesn't look like a proper image.", color=0xff0000)
-                    await dmchannel.send(embed=embed)
-                    return
+            try:
+                image = await validate_image(msg.content)
+            except BadArgument as e:
+                embed=discord.Embed(title="Error stopping event creation", description=str(e), color=0xff0000)
+                await dmchannel.send(embed=embed)
+                return
 
         # Build array
-        new_event = {
-            "id": event_id,
-            "creator": author.id,
-            "create_time": creation_time,
-            "event_name": name,
-            "description": description,
-            "max_attendees": numAttendees,
-            "event_start": startDateTime.timestamp(),
-            "post_id": None,
-            "attending": {},
-            "declined": {},
-            "maybe": {},
-            "image": image,
-            "remindersent": 0,
-            "mention": mention
-        }
+        event = new_event(event_id, author.id, creation_time, name, description, numAttendees, startDateTime.timestamp(), image, mention)
+
+        # Series are stored once, only the upcoming occurrence is posted
+        if recurrence is not None:
+            event["series"] = str(event_id)
+            async with self.config.guild(guild).series() as series_list:
+                series_list[str(event_id)] = {"rule": recurrence, "creator": author.id}
+            await dmchannel.send(f"{describe_recurrence(recurrence)}. The next occurrence will be posted once this one has started.")
 
         # Save event and output
-        mention = get_role_mention(guild, new_event)
+        await self.publish_event(guild, event_channel, event)
 
-        post = await guild.get_channel(event_channel).send(content=mention, embed=get_event_embed(guild, new_event))
-        new_event["post_id"] = post.id
+    @eventboard.command(name="quickcreate")
+    async def event_quickcreate(self, ctx: commands.Context, title: str, date: str, time: str, max_attendees: str = "0", mention: str = "none", image: str = "none", *, description: str = None):
+        """
+        Create an event in one go
+
+        `{title}` the title of the event, use quotes when it contains spaces
+        `{date}` `{time}` the start of the event as `YYYY-MM-DD HH:MM` in 24-hour notation
+        `{max_attendees}` the maximum number of attendees, `0` for unlimited
+        `{mention}` the name of the role to mention or `None`
+        `{image}` the URL of the event image or `None`
+        `{description}` the rest of the message is used as description
+        """
+        author = ctx.author
+        guild = ctx.guild
+        await ctx.message.delete(delay=10)
 
-        async with self.config.guild(guild).events() as event_list:
-            event_list[post.id] = new_event
+        event_channel = await self.config.guild(guild).event_channel()
+        if event_channel is None:
+            await ctx.send("There is no event channel set on the server!", delete_after=15)
+            return
 
-        await create_event_reactions(guild, post)
-        if guild.id not in self.event_cache:
-            self.event_cache[guild.id] = {}
-        self.event_cache[guild.id][str(post.id)] = new_event
+        try:
+            name = validate_title(title)
+            numAttendees = validate_max_attendees(max_attendees)
+            startDateTime = parse_event_start(f"{date} {time}")
+            image = await validate_image(image)
+            mention_id = await self.find_mention_option(guild, mention)
+        except BadArgument as e:
+            await ctx.send(f"Can't create the event. {e}", delete_after=15)
+            return
+
+        creation_time = ctx.message.created_at
+        if creation_time.tzinfo is None:
+            creation_time = creation_time.replace(tzinfo=timezone.utc).timestamp()
+        else:
+            creation_time = creation_time.timestamp()
+
+        event_id = await self.event_ids.allocate(guild)
+
+        event = new_event(event_id, author.id, creation_time, name, validate_description(description), numAttendees, startDateTime.timestamp(), image, mention_id)
+        await self.publish_event(guild, event_channel, event)
     
+    @eventboard.command(name="import")
+    @commands.guild_only()
+    async def event_import(self, ctx: commands.Context):
+        """
+        Create events from an attached CSV or ICS file
+
+        CSV files need the columns `title` and `start` (`YYYY-MM-DD HH:MM`) and can have `max_attendees`, `mention`, `image` and `description`.
+        ICS files use the summary, start and description of every event.
+        """
+        author = ctx.author
+        guild = ctx.guild
+
+        if not await self.is_mod_or_admin(author):
+            await ctx.send("You are not allowed to import events", delete_after=15)
+            return
+
+        if len(ctx.message.attachments) == 0:
+            await ctx.send("Please attach a CSV or ICS file", delete_after=15)
+            return
+
+        attachment = ctx.message.attachments[0]
+        file_format = import_format(attachment.filename)
+        if file_format is None:
+            await ctx.send("Please attach a CSV or ICS file", delete_after=15)
+            return
+
+        event_channel = await self.config.guild(guild).event_channel()
+        if event_channel is None:
+            await ctx.send("There is no event channel set on the server!", delete_after=15)
+            return
+
+        creation_time = ctx.message.created_at
+        if creation_time.tzinfo is None:
+            creation_time = creation_time.replace(tzinfo=timezone.utc).timestamp()
+        else:
+            creation_time = creation_time.timestamp()
+
+        data = await attachment.read()
+        rows = []
+        errors = []
+        mention_options = {str(mention_id) for mention_id in await self.get_mention_options(guild)}
+        try:
+            for number, row in iter_import_rows(data, file_format):
+                try:
+                    rows.append(await self.validate_import_row(guild, row, mention_options))
+                except BadArgument as e:
+                    errors.append(f"Row {number}: {e}")
+                except (KeyError, AttributeError, TypeError):
+                    errors.append(f"Row {number}: This row is incomplete")
+        except BadArgument as e:
+            # The file itself is broken, the rows read up to there are still imported
+            errors.append(str(e))
+
+        # Allocate all ids at once
+        event_id = await self.event_ids.allocate(guild, len(rows))
+
+        events = []
+        for row in rows:
+            events.append(new_event(event_id, author.id, creation_time, row["title"], row["description"], row["max_attendees"], row["start"], row["image"], row["mention"]))
+            event_id += 1
+
+        report = f"Importing {len(events)} events. They will be posted in the background."
+        if len(errors) != 0:
+            report += f"\n{len(errors)} rows were skipped:\n" + "\n".join(errors)
+        for page in pagify(report):
+            await ctx.send(page)
+
+        if len(events) != 0:
+            task = self.bot.loop.create_task(self.publish_imported_events(ctx.channel, guild, event_channel, events))
+            self.import_tasks.add(task)
+            task.add_done_callback(self.import_tasks.discard)
+
+    async def validate_import_row(self, guild: discord.Guild, row: dict, mention_options: set) -> dict:
+        if not row.get("title"):
+            raise BadArgument("The title is missing")
+        if not row.get("start"):
+            raise BadArgument("The start time is missing")
+
+        mention = None
+        mention_name = row.get("mention") or "none"
+        if mention_name.lower() != "none":
+            role = self.role_indexes.get(guild).find_allowed(mention_name, mention_options)
+            if role is None:
+                raise BadArgument("That doesn't seem like a correct group!")
+            mention = role.id
+
+        return {
+            "title": validate_title(row["title"]),
+            "description": validate_description(row.get("description") or None),
+            "max_attendees": validate_max_attendees(row.get("max_attendees") or "0"),
+            "start": parse_event_start(row["start"]).timestamp(),
+            "image": await validate_image(row.get("image") or None),
+            "mention": mention
+        }
+
+    async def publish_imported_events(self, report_channel: discord.TextChannel, guild: discord.Guild, event_channel: int, events: list) -> None:
+        """Post imported events one at a time and store them in one batch"""
+        published = []
+        try:
+            for event in events:
+                try:
+                    await self.publish_event(guild, event_channel, event, save=False)
+                except discord.HTTPException:
+                    log.error(f"Error posting imported event {event['id']}", exc_info=True)
+                    continue
+                published.append(event)
+                await asyncio.sleep(PUBLISH_PACE)
+        finally:
+            if len(published) != 0:
+                await self.store.save_events(guild, published)
+
+        await report_channel.send(f"Imported {len(published)} of {len(events)} events", delete_after=60)
+
     @eventboard.command(name="createdebug")
     @commands.is_owner()
     #@allowed_to_create()
@@ -905,10 +1368,7 @@ class Eventboard(commands.Cog):
         guild = ctx.guild
         commandmsg = ctx.message
 
-        if author.dm_channel is None:
-            dmchannel = await author.create_dm()
-        else:
-            dmchannel = author.dm_channel
+        dmchannel = await self.dm_cache.get_channel(author)
         
         # Get event creation time
         creation_time = ctx.message.created_at
@@ -926,8 +1386,7 @@ class Eventboard(commands.Cog):
             return
 
         # Get event ID
-        event_id = await self.config.guild(guild).next_available_id()
-        await self.config.guild(ctx.guild).next_available_id.set(event_id+1)
+        event_id = await self.event_ids.allocate(guild)
 
         # Build array
         new_event = {
@@ -942,24 +1401,129 @@ class Eventboard(commands.Cog):
             "attending": {},
             "declined": {},
             "maybe": {},
+            "waitlist": {},
             "image": "https://media.sproutsocial.com/uploads/2017/02/10x-featured-social-media-image-size.png",
             "remindersent": 0,
             "mention": None
         }
 
         # Save event and output
-        mention = get_role_mention(guild, new_event)
+        await self.publish_event(guild, event_channel, new_event)
+
+        await commandmsg.delete()
 
-        post = await guild.get_channel(event_channel).send(content=mention, embed=get_event_embed(guild, new_event))
-        new_event["post_id"] = post.id
+    @eventboard.command(name="metrics")
+    @commands.is_owner()
+    async def event_metrics(self, ctx: commands.Context):
+        """
+        Show the internal counters of the eventboard
+        """
+        metrics = self.metrics + self.scheduler.metrics + self.dm_cache.metrics
+        if len(metrics) == 0:
+            await ctx.send("Nothing has been counted yet")
+            return
 
-        async with self.config.guild(guild).events() as event_list:
-            event_list[post.id] = new_event
+        metrics_str = ""
+        for name, value in sorted(metrics.items()):
+            metrics_str += f"{name}: {value}\n"
+        metrics_str += f"dm_channels_cached: {len(self.dm_cache)}\n"
+        metrics_str += f"dm_closed_users: {self.dm_cache.closed_count}\n"
+        for name, value in self.event_cache.memory().items():
+            metrics_str += f"event_cache_{name}: {value}\n"
+        metrics_str += f"event_cache_loads: {self.event_cache.loads}\n"
+        for tier, value in self.event_cache.evictions.items():
+            metrics_str += f"event_cache_{tier}_evictions: {value}\n"
+        for page in pagify(metrics_str):
+            await ctx.send(f"```\n{page}\n```")
+
+    @eventboard.command(name="record")
+    @commands.is_owner()
+    async def event_record(self, ctx: commands.Context, action: str):
+        """
+        Record the reactions and messages that reach the eventboard, for replaying them later
 
-        await create_event_reactions(guild, post)
-        self.event_cache[guild.id][str(post.id)] = new_event
+        `{action}` either `start` or `stop`
+        """
+        action = action.lower()
+        if action == "start":
+            if self.recorder.recording:
+                await ctx.send(f"Already recording to `{self.recorder.path.name}`")
+                return
+            path = cog_data_path(self) / "recordings" / f"{dt.now().strftime('%Y%m%d-%H%M%S')}.jsonl"
+            self.recorder.start(path, await self.get_recording_snapshot())
+            await ctx.send(f"Recording to `{path.name}`")
+        elif action == "stop":
+            if not self.recorder.recording:
+                await ctx.send("Nothing is being recorded")
+                return
+            count = self.recorder.stop()
+            await ctx.send(f"Recorded {count} events to `{self.recorder.path.name}`")
+        else:
+            await ctx.send("Use `start` or `stop`")
 
-        await commandmsg.delete()
+    @eventboard.command(name="replay")
+    @commands.is_owner()
+    async def event_replay(self, ctx: commands.Context, recording: str, speed: float = 1.0, api_latency: float = 0.0):
+        """
+        Replay a recording against a fake Discord and report the outcome
+
+        `{recording}` the file name of the recording
+        `{speed}` 1 for the recorded pace, higher is faster, 0 for as fast as possible
+        `{api_latency}` seconds every fake API call takes
+        """
+        path = cog_data_path(self) / "recordings" / recording
+        if path.parent != cog_data_path(self) / "recordings" or not path.is_file():
+            await ctx.send("I can't find that recording")
+            return
+
+        async with ctx.typing():
+            try:
+                report = await replay_recording(path, speed=speed, api_latency=api_latency)
+            except ValueError as e:
+                await ctx.send(str(e))
+                return
+
+        report_path = path.with_suffix(".report.json")
+        report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+        latency = report["latency"]
+        report_str = f"Replayed {report['events_replayed']} events in {report['duration']}s\n"
+        report_str += f"Handler latency p50 {latency['p50']}s, p90 {latency['p90']}s, p99 {latency['p99']}s, max {latency['max']}s\n"
+        report_str += "API calls: " + (", ".join(f"{name} {count}" for name, count in sorted(report["api_calls"].items())) or "none") + "\n"
+        if report["skipped"]:
+            report_str += "Skipped: " + ", ".join(f"{name} {count}" for name, count in report["skipped"].items()) + "\n"
+        if report["errors"]:
+            report_str += "Errors: " + ", ".join(f"{name} {count}" for name, count in report["errors"].items()) + "\n"
+        for key, event in report["state"].items():
+            report_str += f"{key} {event['event_name']}: {len(event['attending'])} attending, {len(event['declined'])} declined, {len(event['maybe'])} maybe, {len(event['waitlist'])} waitlisted\n"
+        report_str += f"Full report in `{report_path.name}`"
+        for page in pagify(report_str):
+            await ctx.send(page)
+
+    async def get_recording_snapshot(self) -> dict:
+        """Live events of every guild, with what the replay needs to render them"""
+        snapshot = {}
+        for guild_id in await self.config.all_guilds():
+            guild = self.bot.get_guild(int(guild_id))
+            if guild is None:
+                continue
+            events = await self.event_cache.load(guild)
+            member_ids = set()
+            for event in events.values():
+                member_ids.add(int(event["creator"]))
+                for key in ("attending", "declined", "maybe", "waitlist"):
+                    member_ids.update(int(member_id) for member_id in event.get(key, {}))
+            members = []
+            for member_id in member_ids:
+                member = guild.get_member(member_id)
+                if member is not None:
+                    members.append(serialize_member(member))
+            snapshot[str(guild_id)] = {
+                "event_channel": (await self.get_guild_settings(guild)).event_channel,
+                "events": copy.deepcopy(events),
+                "members": members,
+            }
+        return snapshot
 
     @commands.group(name="eventboardset")
     @commands.guild_only()
@@ -977,6 +1541,7 @@ class Eventboard(commands.Cog):
         chan = ctx.channel
         if chan.id == event_channel:
             await self.config.guild(ctx.guild).event_channel.set(None)
+            self.invalidate_guild_settings(ctx.guild)
             await ctx.send("This channel is no longer marked as eventchannel!")
             pins = await chan.pins()
             for pinned_message in pins:
@@ -986,6 +1551,7 @@ class Eventboard(commands.Cog):
 
         if chan and chan.permissions_for(ctx.me).embed_links:
             await self.config.guild(ctx.guild).event_channel.set(chan.id)
+            self.invalidate_guild_settings(ctx.guild)
 
             pin = await ctx.send(f"This channel is now set to Event channel. You can now create events through here by typing `{ctx.clean_prefix}eventboard create`")
             await pin.pin()
@@ -1005,6 +1571,7 @@ class Eventboard(commands.Cog):
         """
 
         await self.config.guild(ctx.guild).autodelete.set(int(minutes))
+        self.invalidate_guild_settings(ctx.guild)
         await ctx.message.delete()
         if minutes < 0:
             await ctx.channel.send("Auto delete events is disabled", delete_after=60)
@@ -1018,15 +1585,52 @@ class Eventboard(commands.Cog):
         Set how long before start time attending members should recieve a reminder
 
         `{minutes}` the number of minutes before the event starts a reminder is being send to the attending members. Set to -1 to disable reminder messages.
+        Use `reminders` to send more than one reminder.
         """
 
-        await self.config.guild(ctx.guild).reminder.set(int(minutes))
+        await self.set_reminder_schedule(ctx.guild, [] if minutes < 0 else [int(minutes)])
         await ctx.message.delete(delay=30)
         if minutes < 0:
             await ctx.channel.send("Event reminder is disabled", delete_after=30)
         else:
             await ctx.channel.send(f"A reminder will be send {minutes} minutes before the event starts", delete_after=30)
 
+    @eventboard_settings.command(name="reminders")
+    @commands.guild_only()
+    async def set_guild_reminders(self, ctx: commands.Context, *, schedule: str):
+        """
+        Set when attending members recieve reminders
+
+        `{schedule}` the times before the event starts, like `24h 1h 0`. Numbers without a unit are minutes. Set to `none` to disable reminder messages.
+        """
+
+        try:
+            stages = parse_reminder_schedule(schedule)
+        except BadArgument as e:
+            await ctx.channel.send(str(e), delete_after=30)
+            return
+
+        await self.set_reminder_schedule(ctx.guild, stages)
+        await ctx.message.delete(delay=30)
+        await ctx.channel.send(f"Event reminders: {describe_reminder_schedule(stages)}", delete_after=30)
+
+    async def set_reminder_schedule(self, guild: discord.Guild, stages: list) -> None:
+        """
+        Change the guild's reminder schedule.
+
+        The sent bits of events on the guild schedule are positions in it, so they are recomputed for the new
+        schedule. Reminders whose time already passed aren't sent afterwards.
+        """
+        await self.config.guild(guild).reminders.set(stages)
+        self.invalidate_guild_settings(guild)
+
+        now = (dt.now()).timestamp()
+        for event in (await self.event_cache.load(guild)).values():
+            if "reminders" in event:
+                continue
+            event["remindersent"] = passed_stages(stages, event["event_start"], now)
+            await self.store.save_event(guild, event)
+
     @eventboard_settings.group(name="mentions")
     @commands.guild_only()
     async def eventboard_settings_mentions(self, ctx: commands.Context) -> None:
@@ -1067,7 +1671,7 @@ class Eventboard(commands.Cog):
         """
 
         await ctx.message.delete(delay=30)
-        role = await get_mentionable_role(ctx.guild, role_str)
+        role = await get_mentionable_role(self.role_indexes.get(ctx.guild), role_str)
         if role is None:
             await ctx.channel.send(f"`{role_str}` can't be found", delete_after=30)
             return
@@ -1083,6 +1687,7 @@ class Eventboard(commands.Cog):
             else:
                 await ctx.channel.send(f"`{role.name}` was added to mentionable roles for events", delete_after=30)
                 mentions_list[role.id] = role.id
+        self.invalidate_guild_settings(ctx.guild)
 
     @eventboard_settings_mentions.command(name="delete")
     @commands.guild_only()
@@ -1092,7 +1697,7 @@ class Eventboard(commands.Cog):
         """
         
         await ctx.message.delete(delay=30)
-        role = await get_mentionable_role(ctx.guild, role_str)
+        role = await get_mentionable_role(self.role_indexes.get(ctx.guild), role_str)
         if role is None:
             await ctx.channel.send(f"`{role_str}` can't be found", delete_after=30)
             return
@@ -1108,6 +1713,7 @@ class Eventboard(commands.Cog):
             else:
                 await ctx.channel.send(f"`{role.name}` was deleted to mentionable roles for events", delete_after=30)
                 del mentions_list[str(role.id)]
+        self.invalidate_guild_settings(ctx.guild)
 
     @eventboard_settings_mentions.command(name="all")
     @commands.guild_only()
@@ -1125,6 +1731,36 @@ class Eventboard(commands.Cog):
         else:
             await self.config.guild(ctx.guild).mention_all.set(0)
             await ctx.channel.send("Mention all is now **Disabled**", delete_after=30)
+        self.invalidate_guild_settings(ctx.guild)
+
+    @eventboard_settings.command(name="storage")
+    @commands.is_owner()
+    async def set_storage_backend(self, ctx: commands.Context, backend: str):
+        """
+        Set where events are stored
+
+        `{backend}` either `config` to store events in the bot config or `sqlite` for a SQLite database in the cog data folder. Existing events are migrated to the new backend.
+        """
+        backend = backend.lower()
+        if backend not in ("config", "sqlite"):
+            await ctx.send("The storage backend must be either `config` or `sqlite`")
+            return
+
+        await self.storage_ready.wait()
+        if backend == self.store.name:
+            await ctx.send(f"Events are already stored in `{backend}`")
+            return
+
+        target = self.get_store(backend)
+        guilds = [discord.Object(id=int(guild_id)) for guild_id in await self.config.all_guilds()]
+        async with ctx.typing():
+            moved = await migrate_events(self.store, target, guilds)
+
+        old_store = self.store
+        self.store = target
+        await self.config.storage_backend.set(backend)
+        await old_store.close()
+        await ctx.send(f"Events are now stored in `{backend}`. {moved} events were migrated.")
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent) -> None:
@@ -1132,19 +1768,20 @@ class Eventboard(commands.Cog):
         Checks for reactions to the event
         """
 
+        self.recorder.record_reaction("add", payload)
         if payload.member.id == self.bot.user.id:
             return
-        if payload.guild_id not in self.event_cache:
+        if not self.event_cache.known(payload.guild_id):
+            return
+        guild = self.bot.get_guild(int(payload.guild_id))
+        if guild is None:
             return
-        if str(payload.message_id) not in self.event_cache[payload.guild_id]:
+        hot = await self.event_cache.hot(guild)
+        if str(payload.message_id) not in hot:
             return
+        hot_event = hot[str(payload.message_id)]
                 
         if payload.emoji.name == "🗑️":
-            event = self.event_cache[payload.guild_id][str(payload.message_id)]
-            guild = self.bot.get_guild(int(payload.guild_id))
-
-            if guild is None:
-                return
             channel = guild.get_channel(int(payload.channel_id))
             if not channel:
                 return
@@ -1152,50 +1789,52 @@ class Eventboard(commands.Cog):
             if not message:
                 return
 
-            if payload.member.dm_channel is None:
-                dmchannel = await payload.member.create_dm()
-            else:
-                dmchannel = payload.member.dm_channel
-
-            def same_author_check_dm(msg):
-                return msg.author == payload.member and msg.channel == dmchannel
+            dmchannel = await self.dm_cache.get_channel(payload.member)
 
-            if payload.member.id != event["creator"] and not await self.is_mod_or_admin(payload.member):            
+            if payload.member.id != hot_event.creator and not await self.is_mod_or_admin(payload.member):            
                 await dmchannel.send("Nice try. But that event isn't yours to delete! :-1:")
-                await message.remove_reaction(payload.emoji, payload.member)
+                await self.remove_member_reaction(message, payload.emoji, payload.member)
                 
                 return
 
             embed=discord.Embed(title="You like to delete the selected event?", description="Please type `Y` for yes and `N` for no", color=0x0000FF)
             await dmchannel.send(embed=embed)
             try:
-                msg = await self.bot.wait_for("message", check=same_author_check_dm, timeout=300)
+                msg = await self.wizards.wait_for_reply(payload.member, dmchannel, timeout=300)
             except asyncio.TimeoutError:
                 await dmchannel.send("I'm not sure where you went. We can try this again later.")
-                await message.remove_reaction(payload.emoji, payload.member)
+                await self.remove_member_reaction(message, payload.emoji, payload.member)
                 return
             else:
                 if msg.content not in ("y","n"):
                     await dmchannel.send("Just 1 letter is hard I guess. Well suit your self... I won't delete anything then.")
-                    await message.remove_reaction(payload.emoji, payload.member)
+                    await self.remove_member_reaction(message, payload.emoji, payload.member)
                     return
 
                 if msg.content == "n":
-                    await message.remove_reaction(payload.emoji, payload.member)
+                    await self.remove_member_reaction(message, payload.emoji, payload.member)
                     await dmchannel.send("Canceled!")
                     return
 
                 deletemsg = await message.delete()
                 if deletemsg is None:
-                    async with self.config.guild(guild).events() as event_list:
-                        del event_list[str(payload.message_id)]
-                        del self.event_cache[guild.id][str(payload.message_id)]
-                        await dmchannel.send("And it's gone...")
+                    event = await self.store.delete_event(guild, payload.message_id)
+                    self.event_cache.pop(guild.id, payload.message_id)
+                    self.post_fingerprints.pop(payload.message_id, None)
+                    await dmchannel.send("And it's gone...")
+
+                    if event is not None and "series" in event:
+                        # Deleting an occurrence ends the series
+                        async with self.config.guild(guild).series() as series_list:
+                            if event["series"] in series_list:
+                                del series_list[event["series"]]
+                                await dmchannel.send("The event won't repeat anymore.")
             return
         
         if payload.emoji.name in ("✅","❌","❔"):
-            event = self.event_cache[payload.guild_id][str(payload.message_id)]
-            guild = self.bot.get_guild(int(payload.guild_id))
+            # The post is rendered from the full event
+            events = await self.event_cache.load(guild)
+            event = events[str(payload.message_id)]
 
             channel = guild.get_channel(int(payload.channel_id))
             if not channel:
@@ -1204,43 +1843,42 @@ class Eventboard(commands.Cog):
             message = await channel.fetch_message(payload.message_id)
             
             if payload.emoji.name == "✅":
-                async with self.config.guild(guild).events() as events_list:
-                    event = self.event_cache[payload.guild_id][str(payload.message_id)]
-                    num_addending = len(event['attending'])
-                    if int(event["max_attendees"]) <= int(num_addending) and int(event["max_attendees"]) != 0:
-                        await channel.send(f"Sorry {payload.member.mention} this event is full.", delete_after=30)
-                        await message.remove_reaction(payload.emoji, payload.member)
-                        return
-
-                    self.event_cache[payload.guild_id][str(payload.message_id)]["attending"][str(payload.member.id)] = str(payload.member.id)
+                if hot_event.is_full:
+                    # Full, queue up until a spot opens
+                    event["waitlist"][str(payload.member.id)] = str(payload.member.id)
+                    await channel.send(f"Sorry {payload.member.mention} this event is full. You are number {len(event['waitlist'])} on the waitlist.", delete_after=30)
+                    clean = {"declined","maybe"}
+                else:
+                    events[str(payload.message_id)]["attending"][str(payload.member.id)] = str(payload.member.id)
                     clean = {"declined","maybe"}
+                    await self.record_signin(guild, event, payload.member.id)
 
                     await self.send_join_notification(guild=guild, member=payload.member, event=event, typeOfNotification="signin")
 
             if payload.emoji.name == "❌":
-                async with self.config.guild(guild).events() as events_list:
-                    self.event_cache[payload.guild_id][str(payload.message_id)]["declined"][str(payload.member.id)] = str(payload.member.id)
-                    clean = {"attending","maybe"}
+                events[str(payload.message_id)]["declined"][str(payload.member.id)] = str(payload.member.id)
+                clean = {"attending","maybe","waitlist"}
 
             if payload.emoji.name == "❔":
-                async with self.config.guild(guild).events() as events_list:
-                    self.event_cache[payload.guild_id][str(payload.message_id)]["maybe"][str(payload.member.id)] = str(payload.member.id)
-                    clean = {"attending","declined"}
+                events[str(payload.message_id)]["maybe"][str(payload.member.id)] = str(payload.member.id)
+                clean = {"attending","declined","waitlist"}
 
+            promote = False
             for reactionClean in clean:
                 
-                if str(payload.user_id) in self.event_cache[payload.guild_id][str(payload.message_id)][reactionClean]:
-                    del self.event_cache[payload.guild_id][str(payload.message_id)][reactionClean][str(payload.user_id)]
-                    await message.remove_reaction(self.reactionEmoji[reactionClean], payload.member)
+                if str(payload.user_id) in events[str(payload.message_id)][reactionClean]:
+                    del events[str(payload.message_id)][reactionClean][str(payload.user_id)]
+                    await self.remove_member_reaction(message, self.reactionEmoji[reactionClean], payload.member)
+                    if reactionClean == "attending":
+                        await self.record_signout(guild, events[str(payload.message_id)], payload.user_id)
+                        promote = True
 
-            async with self.config.guild(guild).events() as events_list:
-                events_list[str(payload.message_id)] = self.event_cache[payload.guild_id][str(payload.message_id)]
+            updated_event = events[str(payload.message_id)]
+            if promote:
+                await self.promote_waitlist(guild, updated_event)
+            await self.store.save_attendance(guild, updated_event, payload.user_id)
 
-            updated_event = self.event_cache[payload.guild_id][str(payload.message_id)]
-            embed = get_event_embed(guild=guild,event=updated_event)
-
-            mention = get_role_mention(guild, updated_event)
-            await message.edit(content=mention, embed=embed, suppress=False)
+            await self.update_event_post(guild, message, updated_event)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent) -> None:
@@ -1248,15 +1886,30 @@ class Eventboard(commands.Cog):
         Checks for reactions to the event
         """
 
+        self.recorder.record_reaction("remove", payload)
         if payload.user_id == self.bot.user.id:
             return 
-        if payload.guild_id not in self.event_cache:
+        if self.reaction_echoes.consume(payload.message_id, payload.user_id, payload.emoji):
+            # The bot removed this reaction itself, the state change was made when it did
+            self.metrics["reaction_echoes_ignored"] += 1
+            return
+        if not self.event_cache.known(payload.guild_id):
+            return
+        guild = self.bot.get_guild(int(payload.guild_id))
+        if guild is None:
+            return
+        hot = await self.event_cache.hot(guild)
+        if str(payload.message_id) not in hot:
             return
-        if str(payload.message_id) not in self.event_cache[payload.guild_id]:
+        statuses = hot[str(payload.message_id)].statuses
+        if payload.emoji.name == "❌" and str(payload.user_id) not in statuses["declined"]:
+            return
+        if payload.emoji.name == "❔" and str(payload.user_id) not in statuses["maybe"]:
             return
 
         if payload.emoji.name in ("✅","❌","❔"):
-            guild = self.bot.get_guild(int(payload.guild_id))
+            # The post is rendered from the full event
+            events = await self.event_cache.load(guild)
             channel = guild.get_channel(int(payload.channel_id))
             member = guild.get_member(int(payload.user_id))
             if not channel:
@@ -1267,219 +1920,593 @@ class Eventboard(commands.Cog):
                 return
                 
             if payload.emoji.name == "✅":
-                async with self.config.guild(guild).events() as events_list:
-                    if str(payload.user_id) not in self.event_cache[payload.guild_id][str(payload.message_id)]["attending"]:
-                        updated_event = self.event_cache[payload.guild_id][str(payload.message_id)]
-                    else:
-                        del self.event_cache[payload.guild_id][str(payload.message_id)]["attending"][str(payload.user_id)]
-                        events_list[str(payload.message_id)] = self.event_cache[payload.guild_id][str(payload.message_id)]
-                        updated_event = self.event_cache[payload.guild_id][str(payload.message_id)]
-                    
-                    #send signout notification
-                    await self.send_join_notification(guild=guild, member=member, event=updated_event, typeOfNotification="signout")
-
-                    mention = get_role_mention(guild, updated_event)
-                    embed = get_event_embed(guild=guild,event=updated_event)
-                    await message.edit(content=mention, embed=embed, suppress=False)
+                waitlist = events[str(payload.message_id)].get("waitlist", {})
+                if str(payload.user_id) in waitlist:
+                    # Left the waitlist before getting a spot
+                    del waitlist[str(payload.user_id)]
+                    updated_event = events[str(payload.message_id)]
+                    await self.store.save_attendance(guild, updated_event, payload.user_id)
+                    await self.update_event_post(guild, message, updated_event)
                     return
 
+                if str(payload.user_id) not in events[str(payload.message_id)]["attending"]:
+                    updated_event = events[str(payload.message_id)]
+                else:
+                    del events[str(payload.message_id)]["attending"][str(payload.user_id)]
+                    updated_event = events[str(payload.message_id)]
+                    await self.store.save_attendance(guild, updated_event, payload.user_id)
+                    await self.record_signout(guild, updated_event, payload.user_id)
+                    await self.promote_waitlist(guild, updated_event)
+                
+                #send signout notification
+                await self.send_join_notification(guild=guild, member=member, event=updated_event, typeOfNotification="signout")
+
+                await self.update_event_post(guild, message, updated_event)
+                return
+
             if payload.emoji.name == "❌":
-                async with self.config.guild(guild).events() as events_list:
-                    if str(payload.user_id) not in self.event_cache[payload.guild_id][str(payload.message_id)]["declined"]:
-                        updated_event = self.event_cache[payload.guild_id][str(payload.message_id)]
-                    else:
-                        del self.event_cache[payload.guild_id][str(payload.message_id)]["declined"][str(payload.user_id)]
-                        events_list[str(payload.message_id)] = self.event_cache[payload.guild_id][str(payload.message_id)]
-                        updated_event = self.event_cache[payload.guild_id][str(payload.message_id)]
-
-                    mention = get_role_mention(guild, updated_event)
-                    embed = get_event_embed(guild=guild,event=updated_event)
-                    await message.edit(content=mention, embed=embed, suppress=False)
-                    return
+                if str(payload.user_id) not in events[str(payload.message_id)]["declined"]:
+                    updated_event = events[str(payload.message_id)]
+                else:
+                    del events[str(payload.message_id)]["declined"][str(payload.user_id)]
+                    updated_event = events[str(payload.message_id)]
+                    await self.store.save_attendance(guild, updated_event, payload.user_id)
+
+                await self.update_event_post(guild, message, updated_event)
+                return
 
             if payload.emoji.name == "❔":
-                async with self.config.guild(guild).events() as events_list:
-                    if str(payload.user_id) not in self.event_cache[payload.guild_id][str(payload.message_id)]["maybe"]:
-                        updated_event = self.event_cache[payload.guild_id][str(payload.message_id)]
-                    else:
-                        del self.event_cache[payload.guild_id][str(payload.message_id)]["maybe"][str(payload.user_id)]
-                        events_list[str(payload.message_id)] = self.event_cache[payload.guild_id][str(payload.message_id)]
-                        updated_event = self.event_cache[payload.guild_id][str(payload.message_id)]
-
-                    mention = get_role_mention(guild, updated_event)
-                    embed = get_event_embed(guild=guild,event=updated_event)
-                    await message.edit(content=mention, embed=embed, suppress=False)
-                    return
+                if str(payload.user_id) not in events[str(payload.message_id)]["maybe"]:
+                    updated_event = events[str(payload.message_id)]
+                else:
+                    del events[str(payload.message_id)]["maybe"][str(payload.user_id)]
+                    updated_event = events[str(payload.message_id)]
+                    await self.store.save_attendance(guild, updated_event, payload.user_id)
 
+                await self.update_event_post(guild, message, updated_event)
+                return
+
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member) -> None:
+        self.member_indexes.update(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member) -> None:
+        self.member_indexes.remove(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        if before.nick != after.nick:
+            self.member_indexes.update(after)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User) -> None:
+        if before.name != after.name or before.discriminator != after.discriminator:
+            self.member_indexes.update_user(after, self.bot.guilds)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self.member_indexes.drop(guild.id)
+        self.role_indexes.invalidate(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        self.role_indexes.invalidate(role.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:
+        self.role_indexes.invalidate(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        self.role_indexes.invalidate(role.guild)
 
     @commands.Cog.listener()
     async def on_message(self, message):
         """
-        Checks for messages in event channel
+        Checks for messages in event channel and routes DM replies to open wizards
         """
 
         if message.guild is None:
+            if self.wizards.dispatch(message):
+                self.recorder.record_message(message)
             return
-        if message.guild.id not in self.event_cache:
+        if not self.event_cache.known(message.guild.id):
             return
         if message.author.id == self.bot.user.id:
             return
 
         channel = message.channel
-        event_channel = await self.config.guild(message.guild).event_channel()
+        event_channel = (await self.get_guild_settings(message.guild)).event_channel
 
         if event_channel is None:
             return
         if event_channel != channel.id:
             return
+
+        # Only the messages the eventboard acts on are recorded
+        self.recorder.record_message(message)
         
         if not message.content[1:].startswith("eventboard"):
-            msg = await message.channel.send("Please don't chat in the event channel")
+            msg = await self.scheduler.run(PRIORITY_MODERATION, f"notice:{channel.id}", lambda: channel.send("Please don't chat in the event channel"))
             await msg.delete(delay=10)
 
         await message.delete(delay=10)
     
     async def maintenance_events(self) -> None:
+        """Run one maintenance task for every shard of this bot process"""
+        await self.storage_ready.wait()
+        if version_info >= VersionInfo.from_str("3.2.0"):
+            await self.bot.wait_until_red_ready()
+        else:
+            await self.bot.wait_until_ready()
+
+        shard_count, shard_ids = self.local_shards()
+        tasks = [self.bot.loop.create_task(self.maintenance_shard(shard_id, shard_count)) for shard_id in shard_ids]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def local_shards(self) -> Tuple[int, List[int]]:
+        """The shard count and the shards this bot process runs"""
+        shard_count = self.bot.shard_count or 1
+        shard_ids = self.bot.shard_ids
+        if shard_ids is None:
+            shard_ids = range(shard_count)
+        return shard_count, list(shard_ids)
+
+    async def shard_guilds(self, shard_id: int, shard_count: int) -> List[Tuple[discord.Guild, discord.TextChannel]]:
+        """The guilds of a shard that have events to maintain, with their event channel"""
+        selected = []
+        for guild_id in await self.config.all_guilds():
+            if shard_for_guild(guild_id, shard_count) != shard_id:
+                continue
+            guild = self.bot.get_guild(int(guild_id))
+            if not self.event_cache.known(guild_id):
+                continue
+            if guild is None:
+                continue
+            settings = await self.get_guild_settings(guild)
+            if settings.event_channel is None:
+                continue
+            channel = guild.get_channel(settings.event_channel)
+            if channel is None:
+                continue
+            selected.append((guild, channel))
+        return selected
+
+    async def maintenance_shard(self, shard_id: int, shard_count: int) -> None:
+        """
+        Maintain the guilds of a single shard.
+
+        Guilds are assigned to shards by id, so processes sharing one Config backend never maintain the same guild.
+        """
         CHECK_DELAY = 60
+        MAX_CONCURRENT_GUILDS = 10
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_GUILDS)
         while self == self.bot.get_cog("Eventboard"):
-            log.debug("Maintenance Task Started")
+            log.debug(f"Maintenance Task Started for shard {shard_id}")
+            cycle_start = time.monotonic()
             try:
-                for guild_id in await self.config.all_guilds():
-                    guild = self.bot.get_guild(int(guild_id))
-                    if guild_id not in self.event_cache:
-                        continue
-                    if guild is None:
-                        continue
-                    event_channel = event_channel = await self.config.guild(guild).event_channel()
-                    if event_channel is None:
-                        continue
-                    channel = guild.get_channel(event_channel)
-                    if channel is None:
-                        continue
-
-                    data = await self.config.guild(guild).events()
-                    for post_id, event_data in data.items():
-                        event = event_data
-                        try:
-                            message = await channel.fetch_message(int(post_id))
-                        except discord.NotFound:
-                            if event["event_start"] < (dt.now()).timestamp():
-                                # Delete historic message
-                                async with self.config.guild(guild).events() as event_list:
-                                    del event_list[str(post_id)]
-                                    del self.event_cache[guild.id][str(post_id)]
-                            else:
-                                # Recreate message
-                                mention = get_role_mention(guild, event)
-                                post = await guild.get_channel(event_channel).send(content=mention, embed=get_event_embed(guild, event))
-                                event["post_id"] = post.id
-
-                                async with self.config.guild(guild).events() as event_list:
-                                    event_list[post.id] = event
-                                    self.event_cache[guild.id][str(post.id)] = event
-                                    del event_list[str(post_id)]
-                                    del self.event_cache[guild.id][str(post_id)]
-
-                                await create_event_reactions(guild, post)
-
-                            continue
-                        
-                        autodelete = int(await self.config.guild(guild).autodelete())
-                        if autodelete >= 0:
-                            autodelete = autodelete * -1
-                            if event["event_start"] < (dt.now() + timedelta(minutes=autodelete)).timestamp():
-                                # Event has started and can be deleted
-                                deletemsg = await message.delete()
-                                if deletemsg is None:
-                                    async with self.config.guild(guild).events() as event_list:
-                                        del event_list[str(post_id)]
-                                        del self.event_cache[guild.id][str(post_id)]
-                                continue
-                            
-                        if len(message.embeds) == 0:
-                            #Embed is removed. Recreate
-                            mention = get_role_mention(guild, event)
-                            embed = get_event_embed(guild=guild,event=event)
-                            await message.edit(content=mention, embed=embed, suppress=False)
-
-                        reminder = int(await self.config.guild(guild).reminder())
-                        if reminder >= 0:
-                            if event["event_start"] < (dt.now() + timedelta(minutes=reminder)).timestamp() and int(event["remindersent"]) == 0:
-                                log.debug("Sending Reminders")
-                                attending = self.event_cache[guild.id][str(post_id)]['attending']
-                                for memberid in attending:
-                                    member = guild.get_member(int(memberid))                                       
-
-                                    if member is not None:
-                                        # check if member wants notification
-                                        if await self.get_wants_notification(guild=guild, member=member, typeOfNotification="eventstart") == 1:
-
-                                            if member.dm_channel is None:
-                                                dmchannel = await member.create_dm()
-                                            else:
-                                                dmchannel = member.dm_channel
-
-                                            temp_event = copy.copy(self.event_cache[guild.id][str(post_id)])
-                                            temp_event["event_name"] = f"REMINDER: {temp_event['event_name']}"
-
-                                            mention = get_role_mention(guild, temp_event)
-                                            embed = get_event_embed(guild=guild,event=temp_event)
-                                            await dmchannel.send(content=mention, embed=embed)
-
-                                async with self.config.guild(guild).events() as event_list:
-                                    self.event_cache[guild.id][str(post_id)]["remindersent"] = 1
-                                    update_event = self.event_cache[guild.id][str(post_id)]
-                                    event_list[str(post_id)] = update_event
-
-                        # Clean up unknowns
-                        clean = 0
-                        for memberid in event["attending"]:
-                            member = guild.get_member(int(memberid))
-                            if member is None:
-                                clean = 1
-                                async with self.config.guild(guild).events() as events_list:
-                                    del self.event_cache[guild.id][str(post_id)]["attending"][str(memberid)]
-                                    events_list[str(post_id)] = self.event_cache[guild.id][str(post_id)]
-                                    updated_event = self.event_cache[guild.id][str(post_id)]
-
-
-                        for memberid in event["declined"]:
-                            member = guild.get_member(int(memberid))
-                            if member is None:
-                                clean = 1
-                                async with self.config.guild(guild).events() as events_list:
-                                    del self.event_cache[guild.id][str(post_id)]["declined"][str(memberid)]
-                                    events_list[str(post_id)] = self.event_cache[guild.id][str(post_id)]
-                                    updated_event = self.event_cache[guild.id][str(post_id)]
-
-
-                        for memberid in event["maybe"]:
-                            member = guild.get_member(int(memberid))
-                            if member is None:
-                                clean = 1
-                                async with self.config.guild(guild).events() as events_list:
-                                    del self.event_cache[guild.id][str(post_id)]["maybe"][str(memberid)]
-                                    events_list[str(post_id)] = self.event_cache[guild.id][str(post_id)]
-                                    updated_event = self.event_cache[guild.id][str(post_id)]
-
-                        if clean == 1:
-                            embed = get_event_embed(guild=guild,event=updated_event)
-                            mention = get_role_mention(guild, updated_event)
-                            await message.edit(content=mention, embed=embed, suppress=False)
-                        
+                guild_tasks = []
+                for guild, channel in await self.shard_guilds(shard_id, shard_count):
+                    guild_tasks.append(self.maintain_guild_isolated(semaphore, guild, channel))
 
+                await asyncio.gather(*guild_tasks)
             except Exception as e:
                 log.error("Error loading events", exc_info=e)
 
-            log.debug("Maintenance Task Stopped")
+            log.debug(f"Maintenance Task Stopped for shard {shard_id} after {time.monotonic() - cycle_start:.2f}s")
             await asyncio.sleep(CHECK_DELAY)
 
+    async def maintain_guild_isolated(self, semaphore: asyncio.Semaphore, guild: discord.Guild, channel: discord.TextChannel) -> None:
+        """
+        Maintain a guild next to the others.
+
+        A slow or failing guild only affects itself: it gets a time budget and its own error handling.
+        """
+        GUILD_TIME_BUDGET = 45
+        async with semaphore:
+            guild_start = time.monotonic()
+            try:
+                finished = await self.maintain_guild(guild, channel, deadline=guild_start + GUILD_TIME_BUDGET)
+            except Exception as e:
+                log.error(f"Error maintaining events of guild {guild.id}", exc_info=e)
+            else:
+                if finished:
+                    log.debug(f"Maintained guild {guild.id} in {time.monotonic() - guild_start:.2f}s")
+                else:
+                    log.warning(f"Maintenance of guild {guild.id} exceeded its budget of {GUILD_TIME_BUDGET}s, continuing next cycle")
+
+    async def maintain_guild(self, guild: discord.Guild, channel: discord.TextChannel, deadline: Optional[float] = None) -> bool:
+        """
+        Archive, recreate, remind and clean up the events of a guild.
+
+        The deadline is only checked between events, archiving and rolling a series are never cut off halfway.
+        Returns False when the deadline stopped it, the next call carries on with the events it didn't get to.
+        """
+        event_channel = channel.id
+        settings = await self.get_guild_settings(guild)
+        data = await self.store.load_events(guild)
+        # Idle guilds are maintained from the store without loading them into the cache
+        self.event_cache.view(guild.id, data)
+
+        post_ids = sorted(data, key=int)
+        cursor = self.maintenance_cursors.pop(guild.id, None)
+        if cursor is not None:
+            post_ids = [post_id for post_id in post_ids if int(post_id) > cursor] + [post_id for post_id in post_ids if int(post_id) <= cursor]
+
+        for post_id in post_ids:
+            if deadline is not None and time.monotonic() > deadline:
+                if cursor is not None:
+                    self.maintenance_cursors[guild.id] = cursor
+                return False
+            cursor = int(post_id)
+
+            event = data[post_id]
+            if "series" in event and int(event.get("series_rolled", 0)) == 0 and event["event_start"] < (dt.now()).timestamp():
+                # Occurrence has started, post the next one of the series
+                await self.roll_series(guild, event_channel, post_id, event)
+
+            try:
+                message = await channel.fetch_message(int(post_id))
+            except discord.NotFound:
+                if event["event_start"] < (dt.now()).timestamp():
+                    # Archive historic event
+                    await self.finish_event(guild, post_id)
+                else:
+                    # Recreate message
+                    await self.store.delete_event(guild, post_id)
+                    self.event_cache.pop(guild.id, post_id)
+                    self.post_fingerprints.pop(int(post_id), None)
+
+                    await self.publish_event(guild, event_channel, event)
+
+                continue
+            
+            autodelete = settings.autodelete
+            if autodelete >= 0:
+                autodelete = autodelete * -1
+                if event["event_start"] < (dt.now() + timedelta(minutes=autodelete)).timestamp():
+                    # Event has started and can be deleted
+                    deletemsg = await message.delete()
+                    if deletemsg is None:
+                        await self.finish_event(guild, post_id)
+                    continue
+                
+            if len(message.embeds) == 0:
+                #Embed is removed. Recreate
+                await self.update_event_post(guild, message, event, force=True)
+
+            # Posting an event or a reaction may have loaded the guild since, changes go to the cached events then
+            events = self.event_cache.loaded(guild.id)
+            if events is None:
+                events = data
+            cached_event = events.get(str(post_id))
+            if cached_event is None:
+                # Deleted while maintenance was running
+                continue
+            stages = event_reminder_schedule(cached_event, settings.reminders)
+            if len(stages) > 0:
+                due = due_stages(stages, cached_event["event_start"], cached_event["remindersent"], (dt.now()).timestamp())
+                if due != 0:
+                    log.debug("Sending Reminders")
+                    attending = events[str(post_id)]['attending']
+                    temp_event = copy.copy(events[str(post_id)])
+                    temp_event["event_name"] = f"REMINDER: {temp_event['event_name']}"
+                    mention = get_role_mention(guild, temp_event)
+                    embed = get_event_embed(guild=guild,event=temp_event)
+
+                    reminders = []
+                    for memberid in attending:
+                        member = guild.get_member(int(memberid))                                       
+
+                        if member is not None:
+                            # check if member wants notification
+                            if settings.wants_notification(member.id, "eventstart") == 1:
+                                reminders.append(self.send_dm(member, PRIORITY_REMINDER, content=mention, embed=embed))
+
+                    # Queued all at once, signup edits still go first
+                    for result in await asyncio.gather(*reminders, return_exceptions=True):
+                        if isinstance(result, Exception):
+                            log.error("Error sending reminder", exc_info=result)
+
+                    events[str(post_id)]["remindersent"] = int(cached_event["remindersent"]) | due
+                    update_event = events[str(post_id)]
+                    await self.store.save_event(guild, update_event)
+
+            # Clean up unknowns
+            clean = 0
+            for memberid in list(cached_event["attending"]):
+                member = guild.get_member(int(memberid))
+                if member is None:
+                    clean = 1
+                    del events[str(post_id)]["attending"][str(memberid)]
+                    updated_event = events[str(post_id)]
+                    await self.store.save_attendance(guild, updated_event, memberid)
+
+
+            for memberid in list(cached_event["declined"]):
+                member = guild.get_member(int(memberid))
+                if member is None:
+                    clean = 1
+                    del events[str(post_id)]["declined"][str(memberid)]
+                    updated_event = events[str(post_id)]
+                    await self.store.save_attendance(guild, updated_event, memberid)
+
+
+            for memberid in list(cached_event["maybe"]):
+                member = guild.get_member(int(memberid))
+                if member is None:
+                    clean = 1
+                    del events[str(post_id)]["maybe"][str(memberid)]
+                    updated_event = events[str(post_id)]
+                    await self.store.save_attendance(guild, updated_event, memberid)
+
+            if clean == 1:
+                await self.update_event_post(guild, message, updated_event)
+
+        return True
+
+    async def update_event_fields(self, guild: discord.Guild, post_id: int, **fields) -> dict:
+        """Change fields of an event and bump its revision"""
+        event = (await self.event_cache.load(guild))[str(post_id)]
+        event.update(fields)
+        event["revision"] = event.get("revision", 0) + 1
+        await self.store.save_event(guild, event)
+        self.event_cache.refresh(guild.id, event)
+        return event
+
+    def post_fingerprint(self, mention: Optional[str], embed: discord.Embed) -> int:
+        return hash((mention, json.dumps(embed.to_dict(), sort_keys=True)))
+
+    async def update_event_post(self, guild: discord.Guild, message: discord.Message, event: dict, force: bool = False) -> bool:
+        """
+        Render the event and edit its post, unless the post already shows exactly this.
+
+        Returns whether the post was edited.
+        """
+        mention = get_role_mention(guild, event)
+        embed = get_event_embed(guild=guild,event=event)
+        fingerprint = self.post_fingerprint(mention, embed)
+        if not force and self.post_fingerprints.get(message.id) == fingerprint:
+            self.metrics["post_edits_skipped"] += 1
+            return False
+
+        async def edit():
+            await message.edit(content=mention, embed=embed, suppress=False)
+            self.post_fingerprints[message.id] = fingerprint
+            self.metrics["post_edits"] += 1
+            return True
+
+        # A newer render of the same post replaces an edit that is still queued
+        return bool(await self.scheduler.run(PRIORITY_POST, f"post:{message.channel.id}", edit, key=("post", message.id)))
+
+    async def remove_member_reaction(self, message: discord.Message, emoji, member: discord.Member) -> None:
+        # Discord echoes the removal as a remove event, expected before the call as it can arrive first
+        self.reaction_echoes.expect(message.id, member.id, emoji)
+        try:
+            await self.scheduler.run(PRIORITY_REACTION, f"reaction:{message.channel.id}", lambda: message.remove_reaction(emoji, member))
+        except Exception:
+            self.reaction_echoes.cancel(message.id, member.id, emoji)
+            raise
+
+    async def send_dm(self, member: discord.abc.User, priority: int, *args, **kwargs) -> Optional[discord.Message]:
+        """
+        Send a DM through the outbound scheduler.
+
+        Members with closed DMs are skipped without queueing anything, returns `None` for those.
+        """
+        if self.dm_cache.is_closed(member.id):
+            self.dm_cache.metrics["dm_skipped_closed"] += 1
+            return None
+        return await self.scheduler.run(priority, "dm", lambda: self.dm_cache.send(member, *args, **kwargs))
+
+    def queue_dm(self, member: discord.abc.User, priority: int, *args, **kwargs) -> None:
+        """
+        Queue a DM without waiting for it.
+
+        For notifications sent while handling a signup, so the signup isn't held up behind queued reminders.
+        """
+        if self.dm_cache.is_closed(member.id):
+            self.dm_cache.metrics["dm_skipped_closed"] += 1
+            return
+        future = self.scheduler.submit(priority, "dm", lambda: self.dm_cache.send(member, *args, **kwargs))
+        future.add_done_callback(self.log_queued_dm)
+
+    def log_queued_dm(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            log.error("Error sending notification", exc_info=future.exception())
+
+    async def publish_event(self, guild: discord.Guild, event_channel: int, event: dict, save: bool = True) -> discord.Message:
+        mention = get_role_mention(guild, event)
+        embed = get_event_embed(guild, event)
+        post = await guild.get_channel(event_channel).send(content=mention, embed=embed)
+        event["post_id"] = post.id
+        self.post_fingerprints[post.id] = self.post_fingerprint(mention, embed)
+
+        if save:
+            await self.store.save_event(guild, event)
+
+        await create_event_reactions(guild, post)
+        await self.event_cache.add(guild, event)
+        return post
+
+    async def finish_event(self, guild: discord.Guild, post_id: str) -> None:
+        """Move a finished event out of the live events into the archive"""
+        event = await self.store.load_event(guild, post_id)
+        if event is not None:
+            # Archived before it's deleted, a failed write leaves the event live for the next pass
+            await self.archive.append(guild.id, event)
+
+        await self.store.delete_event(guild, post_id)
+        self.event_cache.pop(guild.id, post_id)
+        self.post_fingerprints.pop(int(post_id), None)
+
+        if event is not None:
+            await self.record_finished(guild, event)
+
+    async def promote_waitlist(self, guild: discord.Guild, event: dict) -> Optional[str]:
+        """
+        Give a free spot to the first member on the waitlist.
+
+        The caller renders the post. Returns the promoted member id, if any.
+        """
+        waitlist = event.get("waitlist", {})
+        if len(waitlist) == 0:
+            return None
+        if int(event["max_attendees"]) != 0 and len(event["attending"]) >= int(event["max_attendees"]):
+            return None
+
+        member_id = next(iter(waitlist))
+        del waitlist[member_id]
+        event["attending"][member_id] = member_id
+        await self.store.save_attendance(guild, event, member_id)
+        await self.record_signin(guild, event, member_id)
+
+        member = guild.get_member(int(member_id))
+        if member is not None:
+            self.queue_dm(member, PRIORITY_NOTIFICATION, f"A spot opened up in {event['event_name']}. You are now signed up!")
+        return member_id
+
+    async def get_stats(self, guild: discord.Guild) -> dict:
+        if guild.id not in self.stats_cache:
+            self.stats_cache[guild.id] = await self.config.guild(guild).stats()
+        return self.stats_cache[guild.id]
+
+    async def update_member_stats(self, guild: discord.Guild, member_id: int, **changes) -> None:
+        stats = await self.get_stats(guild)
+        member_stats = stats["members"].setdefault(str(member_id), new_member_stats())
+        for key, value in changes.items():
+            member_stats[key] += value
+        await self.config.guild(guild).stats.set_raw("members", str(member_id), value=member_stats)
+
+    async def record_signin(self, guild: discord.Guild, event: dict, member_id: int) -> None:
+        await self.update_member_stats(guild, member_id, signups=1)
+
+    async def record_signout(self, guild: discord.Guild, event: dict, member_id: int) -> None:
+        if event["event_start"] - (dt.now()).timestamp() < NOSHOW_WINDOW:
+            await self.update_member_stats(guild, member_id, signouts=1, noshows=1)
+        else:
+            await self.update_member_stats(guild, member_id, signouts=1)
+
+    async def record_finished(self, guild: discord.Guild, event: dict) -> None:
+        stats = await self.get_stats(guild)
+        stats["events"]["finished"] += 1
+        stats["events"]["attended"] += len(event["attending"])
+        event_fill = fill_rate(event)
+        if event_fill is not None:
+            stats["events"]["capped"] += 1
+            stats["events"]["fill_sum"] += event_fill
+
+        await self.config.guild(guild).stats.set_raw("events", value=stats["events"])
+
+        for memberid in event["attending"]:
+            member_stats = stats["members"].setdefault(str(memberid), new_member_stats())
+            member_stats["attended"] += 1
+            await self.config.guild(guild).stats.set_raw("members", str(memberid), value=member_stats)
+
+    async def roll_series(self, guild: discord.Guild, event_channel: int, post_id: str, event: dict) -> None:
+        """
+        Post the next occurrence of a repeating event.
+
+        Only the upcoming occurrence is ever materialized, the following one is rolled forward once it has started.
+        The event is marked as rolled once the next occurrence is posted, a failed post is retried on the next pass.
+        """
+        series = await self.config.guild(guild).series()
+        if event["series"] in series:
+            rule = series[event["series"]]["rule"]
+            event_start = next_occurrence_after(rule, event["event_start"], (dt.now()).timestamp())
+
+            event_id = await self.event_ids.allocate(guild)
+
+            next_event = new_event(event_id, event["creator"], (dt.now()).timestamp(), event["event_name"], event["description"], event["max_attendees"], event_start, event["image"], event["mention"])
+            next_event["series"] = event["series"]
+            log.debug(f"Rolling series {event['series']} forward to event {event_id}")
+            await self.publish_event(guild, event_channel, next_event)
+
+        event["series_rolled"] = 1
+        cached_event = self.event_cache.get_event(guild.id, post_id)
+        if cached_event is not None:
+            cached_event["series_rolled"] = 1
+            await self.store.save_event(guild, cached_event)
+        else:
+            await self.store.save_event(guild, event)
+
+    async def get_mention_options(self, guild: discord.Guild) -> list:
+        """Ids of the roles an event may mention"""
+        settings = await self.get_guild_settings(guild)
+        if settings.mention_all == 1:
+            return [role.id for role in self.role_indexes.get(guild).mentionable]
+        return list(settings.mentions)
+
+    async def find_mention_option(self, guild: discord.Guild, role_name: str) -> Optional[int]:
+        if role_name.lower() == "none":
+            return None
+        mention_options = {str(mention_id) for mention_id in await self.get_mention_options(guild)}
+        role = self.role_indexes.get(guild).find_allowed(role_name, mention_options)
+        if role is not None:
+            return role.id
+        raise BadArgument("That doesn't seem like a correct group!")
+
+    async def get_guild_settings(self, guild: discord.Guild) -> GuildSettings:
+        if guild.id not in self.settings_cache:
+            self.settings_cache[guild.id] = await GuildSettings.load(self.config, guild)
+        return self.settings_cache[guild.id]
+
+    def invalidate_guild_settings(self, guild: discord.Guild) -> None:
+        self.settings_cache.pop(guild.id, None)
+
+    async def select_member(self, guild: discord.Guild, author: discord.Member, dmchannel: discord.DMChannel, member_name: str) -> Optional[discord.Member]:
+        """
+        Find the member the author means, letting them pick from close matches.
+
+        Returns `None` when the author cancels, times out or runs out of tries.
+        """
+        MAX_TRIES = 3
+        for attempt in range(MAX_TRIES):
+            if member_name.lower() == "none":
+                return None
+
+            member_ids, exact = self.member_indexes.get(guild).search(member_name)
+            members = [member for member in (guild.get_member(member_id) for member_id in member_ids) if member is not None]
+            if exact and len(members) == 1:
+                return members[0]
+
+            if len(members) == 0:
+                embed=discord.Embed(title="Error", description="I can't find anyone with that name. Try another name or type `None` to cancel.", color=0xff0000)
+            else:
+                member_str = ""
+                for number, member in enumerate(members, start=1):
+                    nick_str = "" if member.nick is None else f" ({member.nick})"
+                    member_str += f"{number}. {member}{nick_str}\n"
+                embed=discord.Embed(title="Did you mean", description=f"Enter the number of the list, another name to search again or `None` to cancel.\n\n{member_str}", color=0xffff00)
+            await dmchannel.send(embed=embed)
+
+            try:
+                msg = await self.wizards.wait_for_reply(author, dmchannel, timeout=300)
+            except asyncio.TimeoutError:
+                await dmchannel.send("I'm not sure where you went. We can try this again later.")
+                return None
+
+            reply = msg.content.strip()
+            if reply.isdecimal() and 1 <= int(reply) <= len(members):
+                return members[int(reply) - 1]
+            member_name = reply
+
+        embed=discord.Embed(title="Error", description="I can't find anyone with that name", color=0xff0000)
+        await dmchannel.send(embed=embed)
+        return None
+
     async def get_manageble_events(self, guild: discord.Guild, member: discord.Member):
-        event_posts = self.event_cache[guild.id]
+        event_posts = await self.event_cache.load(guild)
         responce = {}
         i = 1
         for event_post in event_posts:
-            event = self.event_cache[guild.id][event_post]
+            event = event_posts[event_post]
             if await self.is_mod_or_admin(member) == True:
                 responce[i] = event
                 i += 1
@@ -1492,7 +2519,7 @@ class Eventboard(commands.Cog):
         if guild is None:
             return None
         
-        event_channel_id = await self.config.guild(guild).event_channel() 
+        event_channel_id = (await self.get_guild_settings(guild)).event_channel
         channel = guild.get_channel(event_channel_id)
 
         return channel
@@ -1507,30 +2534,55 @@ class Eventboard(commands.Cog):
         return post
 
     async def get_wants_notification(self, guild: discord.Guild, member: discord.Member, typeOfNotification: str):
-
-        if typeOfNotification == "eventstart":
-            notifications = await self.config.guild(guild).notifications_eventstart()
-        elif  typeOfNotification == "signout":
-            notifications = await self.config.guild(guild).notifications_signout()
-        elif  typeOfNotification == "signin":
-            notifications = await self.config.guild(guild).notifications_signin()
-
-        if str(member.id) in notifications:
-            return notifications[str(member.id)]
-
-        return 1
+        settings = await self.get_guild_settings(guild)
+        return settings.wants_notification(member.id, typeOfNotification)
     
     async def send_join_notification(self, guild: discord.Guild, member: discord.Member, event, typeOfNotification: str):
         
         eventposter = guild.get_member(int(event['creator']))
         if eventposter is not None:
             if await self.get_wants_notification(guild=guild, member=eventposter, typeOfNotification=typeOfNotification) == 1:
-                if eventposter.dm_channel is None:
-                    dmchannel = await eventposter.create_dm()
-                else:
-                    dmchannel = eventposter.dm_channel
+                interval = (await self.get_guild_settings(guild)).digest_interval(eventposter.id)
+                if interval > 0:
+                    self.digests.add(guild.id, eventposter.id, event, member.id, member.mention, typeOfNotification, interval)
+                    return
 
                 if typeOfNotification == "signin":
-                    await dmchannel.send(f"{member.mention} has signed up from {event['event_name']}")
+                    self.queue_dm(eventposter, PRIORITY_NOTIFICATION, f"{member.mention} has signed up from {event['event_name']}")
                 elif typeOfNotification == "signout":
-                    await dmchannel.send(f"{member.mention} has signed out from {event['event_name']}")
\ No newline at end of file
+                    self.queue_dm(eventposter, PRIORITY_NOTIFICATION, f"{member.mention} has signed out from {event['event_name']}")
+
+    async def send_digests(self) -> None:
+        """Send the sign in/out digests that are due"""
+        await self.storage_ready.wait()
+        while self == self.bot.get_cog("Eventboard"):
+            await self.send_due_digests()
+            await asyncio.sleep(DIGEST_CHECK_DELAY)
+
+    async def send_due_digests(self, force: bool = False) -> None:
+        """Send the digests that are due, or all pending ones when forced"""
+        for guild_id, creator_id, events in self.digests.pop_due(force=force):
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            eventposter = guild.get_member(creator_id)
+            digest_str = format_digest(events)
+            if eventposter is None or digest_str == "":
+                continue
+            try:
+                for page in pagify(digest_str):
+                    await self.send_dm(eventposter, PRIORITY_NOTIFICATION, page)
+            except Exception as e:
+                log.error(f"Error sending digest to {creator_id}", exc_info=e)
+            else:
+                self.metrics["digests_sent"] += 1
+
+    async def flush_outbound(self) -> None:
+        """Send the pending digests before the scheduler stops, they would be dropped with the cog otherwise"""
+        try:
+            if len(self.digests) > 0 and self.storage_ready.is_set():
+                await asyncio.wait_for(self.send_due_digests(force=True), timeout=DIGEST_FLUSH_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning(f"{len(self.digests)} digests were left unsent when unloading")
+        finally:
+            self.scheduler.stop()
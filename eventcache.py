@@ -0,0 +1,237 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import discord
+
+import logging
+
+log = logging.getLogger("red.burnacid.eventboard")
+
+# Event keys holding member maps, shared between the hot record and the full event
+STATUSES = ("attending", "declined", "maybe", "waitlist")
+# Bytes of full events kept in memory over all guilds
+COLD_BUDGET = 32 * 1024 * 1024
+# Seconds without access after which a guild is dropped from memory entirely
+HOT_IDLE_TTL = 6 * 3600
+# Seconds a guild stays in memory after its last access, whatever the budget
+MIN_RESIDENT = 300
+
+
+def deep_size(obj, seen: Optional[Set[int]] = None) -> int:
+    """Approximate memory use of a structure of dicts, lists and scalars"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif isinstance(obj, HotEvent):
+        size += deep_size(obj.creator, seen) + deep_size(obj.max_attendees, seen) + deep_size(obj.statuses, seen)
+    return size
+
+
+class HotEvent:
+    """
+    What reaction handling needs to decide on a reaction: capacity, creator and the status maps.
+
+    Reactions that change the event still need the full event to render the post.
+
+    The status maps are the same objects as in the full event, a change through either is seen by both.
+    """
+
+    __slots__ = ("creator", "max_attendees", "statuses")
+
+    def __init__(self, event: dict):
+        self.creator = event["creator"]
+        self.max_attendees = int(event["max_attendees"])
+        self.statuses = {key: event.setdefault(key, {}) for key in STATUSES}
+
+    def bind(self, event: dict) -> None:
+        """Make a freshly loaded event share the status maps of this record"""
+        for key in STATUSES:
+            event[key] = self.statuses[key]
+        self.creator = event["creator"]
+        self.max_attendees = int(event["max_attendees"])
+
+    @property
+    def is_full(self) -> bool:
+        return self.max_attendees != 0 and len(self.statuses["attending"]) >= self.max_attendees
+
+
+class EventCache:
+    """
+    Live events in two tiers.
+
+    The hot tier holds a `HotEvent` per post of every guild that saw use recently. The cold tier holds
+    the full events, descriptions and all, of the guilds used most recently within a memory budget.
+    Guilds are evicted from the cold tier least recently used first and from both tiers once they are
+    idle for a while. Evicted guilds are loaded again from the store on their next access.
+
+    Eviction only happens in `sweep`, never for a guild accessed in the last `MIN_RESIDENT` seconds.
+    The size of a guild's full events is measured when they are loaded and when events are added.
+    """
+
+    def __init__(self, loader: Callable[[discord.Guild], Awaitable[Dict[str, dict]]], cold_budget: int = COLD_BUDGET, hot_idle_ttl: float = HOT_IDLE_TTL, min_resident: float = MIN_RESIDENT):
+        self.loader = loader
+        self.cold_budget = cold_budget
+        self.hot_idle_ttl = hot_idle_ttl
+        self.min_resident = min_resident
+        self.loads = 0
+        self.evictions = {"cold": 0, "hot": 0}
+        self._known: Set[int] = set()
+        self._hot: Dict[int, Dict[str, HotEvent]] = {}
+        self._cold: "OrderedDict[int, Dict[str, dict]]" = OrderedDict()
+        self._sizes: Dict[int, int] = {}
+        self._last_used: Dict[int, float] = {}
+
+    def register(self, guild_id: int) -> None:
+        """Remember a guild that has eventboard settings, without loading anything"""
+        self._known.add(guild_id)
+
+    def known(self, guild_id: int) -> bool:
+        return guild_id in self._known
+
+    def _touch(self, guild_id: int) -> None:
+        self._last_used[guild_id] = time.monotonic()
+        if guild_id in self._cold:
+            self._cold.move_to_end(guild_id)
+
+    async def load(self, guild: discord.Guild) -> Dict[str, dict]:
+        """Full events of the guild by post id, loaded from the store when they were evicted"""
+        self._known.add(guild.id)
+        self._touch(guild.id)
+        if guild.id in self._cold:
+            return self._cold[guild.id]
+
+        events = await self.loader(guild)
+        self.loads += 1
+        if guild.id in self._cold:
+            # Loaded by someone else in the meantime
+            return self._cold[guild.id]
+
+        hot = self._hot.get(guild.id)
+        if hot is None:
+            self._hot[guild.id] = {post_id: HotEvent(event) for post_id, event in events.items()}
+        else:
+            # Attendance changes are written through, the hot maps are as new as the store
+            for post_id, event in events.items():
+                if post_id in hot:
+                    hot[post_id].bind(event)
+                else:
+                    hot[post_id] = HotEvent(event)
+            for post_id in [post_id for post_id in hot if post_id not in events]:
+                del hot[post_id]
+
+        self._cold[guild.id] = events
+        self._sizes[guild.id] = deep_size(events)
+        self._touch(guild.id)
+        return events
+
+    async def hot(self, guild: discord.Guild) -> Dict[str, HotEvent]:
+        """Hot records of the guild by post id"""
+        if guild.id not in self._hot:
+            await self.load(guild)
+        else:
+            self._touch(guild.id)
+        return self._hot[guild.id]
+
+    def view(self, guild_id: int, events: Dict[str, dict]) -> Dict[str, dict]:
+        """
+        Events to work on for a guild, without counting as an access.
+
+        The cached events when the guild is in memory, otherwise the given copies from the store,
+        bound to the hot records so changes to the attendance reach them.
+        """
+        if guild_id in self._cold:
+            return self._cold[guild_id]
+        hot = self._hot.get(guild_id)
+        if hot is not None:
+            for post_id, event in events.items():
+                if post_id in hot:
+                    hot[post_id].bind(event)
+        return events
+
+    def loaded(self, guild_id: int) -> Optional[Dict[str, dict]]:
+        """Full events of the guild when it's in memory, without counting as an access"""
+        return self._cold.get(guild_id)
+
+    def get_event(self, guild_id: int, post_id) -> Optional[dict]:
+        """Full event when it's in memory"""
+        return self._cold.get(guild_id, {}).get(str(post_id))
+
+    def refresh(self, guild_id: int, event: dict) -> None:
+        """Pick up a changed capacity or creator in the hot record"""
+        hot = self._hot.get(guild_id, {}).get(str(event["post_id"]))
+        if hot is not None:
+            hot.bind(event)
+
+    async def add(self, guild: discord.Guild, event: dict) -> None:
+        events = await self.load(guild)
+        events[str(event["post_id"])] = event
+        self._sizes[guild.id] = self._sizes.get(guild.id, 0) + deep_size(event)
+        self._hot[guild.id][str(event["post_id"])] = HotEvent(event)
+
+    def pop(self, guild_id: int, post_id) -> Optional[dict]:
+        hot = self._hot.get(guild_id)
+        if hot is not None:
+            hot.pop(str(post_id), None)
+        cold = self._cold.get(guild_id)
+        if cold is None:
+            return None
+        event = cold.pop(str(post_id), None)
+        if event is not None:
+            self._sizes[guild_id] = max(self._sizes.get(guild_id, 0) - deep_size(event), 0)
+        return event
+
+    def resident(self) -> Dict[int, Dict[str, dict]]:
+        return dict(self._cold)
+
+    def sweep(self) -> Dict[str, int]:
+        """Evict idle guilds and bring the full events within budget. Returns the number of guilds evicted per tier."""
+        now = time.monotonic()
+        evicted = {"cold": 0, "hot": 0}
+
+        for guild_id in [guild_id for guild_id in self._hot if now - self._last_used.get(guild_id, 0) > self.hot_idle_ttl]:
+            del self._hot[guild_id]
+            self._last_used.pop(guild_id, None)
+            evicted["hot"] += 1
+            if guild_id in self._cold:
+                del self._cold[guild_id]
+                del self._sizes[guild_id]
+                evicted["cold"] += 1
+
+        total = sum(self._sizes.values())
+        for guild_id in list(self._cold):
+            if total <= self.cold_budget:
+                break
+            if now - self._last_used.get(guild_id, 0) < self.min_resident:
+                # Least recently used first, the rest is even more recent
+                break
+            del self._cold[guild_id]
+            total -= self._sizes.pop(guild_id)
+            evicted["cold"] += 1
+
+        self.evictions["cold"] += evicted["cold"]
+        self.evictions["hot"] += evicted["hot"]
+        return evicted
+
+    def memory(self) -> Dict[str, int]:
+        """Approximate bytes and guilds per tier"""
+        # Status maps are shared, they count towards the hot tier only
+        seen = set()
+        hot_size = deep_size(self._hot, seen)
+        cold_size = sum(deep_size(events, seen) for events in self._cold.values())
+        return {
+            "hot_guilds": len(self._hot),
+            "hot_events": sum(len(events) for events in self._hot.values()),
+            "hot_bytes": hot_size,
+            "cold_guilds": len(self._cold),
+            "cold_bytes": cold_size,
+            "cold_budget": self.cold_budget,
+        }
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from datetime import datetime as dt
+from typing import Callable, Dict, IO, Iterable, Iterator, Set
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_FIELDS = ["event_id", "event_name", "event_start", "state", "member_id", "member_name", "response"]
+RESPONSES = ("attending", "declined", "maybe")
+
+
+def collect_member_ids(events: Iterable[dict]) -> Set[int]:
+    member_ids = set()
+    for event in events:
+        for response in RESPONSES:
+            for member_id in event.get(response, {}):
+                member_ids.add(int(member_id))
+    return member_ids
+
+
+def iter_attendance_rows(events: Iterable[dict], names: Dict[int, str]) -> Iterator[dict]:
+    """One row per event response, events without any response get a single row without a member"""
+    for event in events:
+        base = {
+            "event_id": event["id"],
+            "event_name": event["event_name"],
+            "event_start": dt.fromtimestamp(event["event_start"]).strftime("%Y-%m-%d %H:%M"),
+            "state": "finished" if "archived" in event else "live",
+        }
+        has_rows = False
+        for response in RESPONSES:
+            for member_id in event.get(response, {}):
+                row = dict(base)
+                row["member_id"] = int(member_id)
+                row["member_name"] = names.get(int(member_id), "Unknown")
+                row["response"] = response
+                has_rows = True
+                yield row
+
+        if not has_rows:
+            row = dict(base)
+            row["member_id"] = None
+            row["member_name"] = None
+            row["response"] = None
+            yield row
+
+
+def write_export(fp: IO[bytes], events: Callable[[], Iterable[dict]], names: Dict[int, str], export_format: str) -> int:
+    """
+    Stream the export into a binary file, row by row.
+
+    `events` is called to get a fresh iterator so the archive is streamed instead of being loaded.
+    Returns the number of rows written.
+    """
+    text = io.TextIOWrapper(fp, encoding="utf-8", newline="")
+    rows = 0
+    if export_format == "csv":
+        writer = csv.DictWriter(text, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for row in iter_attendance_rows(events(), names):
+            writer.writerow(row)
+            rows += 1
+    else:
+        for row in iter_attendance_rows(events(), names):
+            text.write(json.dumps(row) + "\n")
+            rows += 1
+
+    text.flush()
+    text.detach()
+    return rows
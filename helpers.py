@@ -6,12 +6,19 @@ from redbot.core import commands, Config
 from discord.ext.commands.errors import BadArgument
 
 import re
+from typing import Collection, Optional
 
 import logging
 
+from .roleindex import RoleIndex
+
 IMAGE_LINKS = re.compile(r"(http[s]?:\/\/[^\"\']*\.(?:png|jpg|jpeg|gif|png))", flags=re.I)
+START_TIME = re.compile("^[0-9]{4}-(0?[1-9]|1[012])-(0?[1-9]|[12][0-9]|3[01]) (0?[0-9]|1[0-9]|2[0-4]):(0?[0-9]|[1-5][0-9])$")
 log = logging.getLogger("red.burnacid.eventboard")
 
+# Discord rejects embed field values longer than this
+FIELD_LIMIT = 1024
+
 def get_role_mention(guild: discord.Guild, event: dict):
     if event["mention"] is None:
         return None
@@ -22,6 +29,36 @@ def get_role_mention(guild: discord.Guild, event: dict):
     
     return role.mention
 
+def render_member_list(guild: discord.Guild, members: Collection, limit: int = FIELD_LIMIT) -> str:
+    """
+    Mentions of the members, one per line, within the embed field limit.
+
+    Members that don't fit are summarized as `+K more`. Only the visible members are resolved.
+    """
+    if len(members) == 0:
+        return "-"
+
+    member_str = ""
+    shown = 0
+    for memberid in members:
+        member = guild.get_member(int(memberid))
+        if member is None:
+            line = "Unknown\n"
+        else:
+            line = f"{member.mention}\n"
+
+        # Keep room for the overflow summary of the remaining members
+        remaining = len(members) - shown - 1
+        summary_len = 0 if remaining == 0 else len(f"+{remaining} more")
+        if len(member_str) + len(line) + summary_len > limit:
+            break
+        member_str += line
+        shown += 1
+
+    if shown < len(members):
+        member_str += f"+{len(members) - shown} more"
+    return member_str
+
 def get_event_embed(guild: discord.Guild, event: dict) -> discord.Embed:
 
     if event["description"] is None:
@@ -29,9 +66,13 @@ def get_event_embed(guild: discord.Guild, event: dict) -> discord.Embed:
     else:
         emb = discord.Embed(title=event["event_name"], description=event["description"], color=0xffff00)
 
-    autor_str = guild.get_member(event["creator"]).nick
-    if autor_str == None:
-        autor_str = guild.get_member(event["creator"]).name
+    creator = guild.get_member(int(event["creator"]))
+    if creator is None:
+        autor_str = "Unknown"
+    else:
+        autor_str = creator.nick
+        if autor_str == None:
+            autor_str = creator.name
     attending = len(event["attending"])
 
     if event["max_attendees"] == "0":
@@ -40,41 +81,10 @@ def get_event_embed(guild: discord.Guild, event: dict) -> discord.Embed:
         max_attendees = event["max_attendees"]
         attending_str = f" ({attending}/{max_attendees})"
 
-    if attending == 0:
-        attending_members = "-"
-    else:
-        attending_members = ""
-        for memberid in event["attending"]:
-            member = guild.get_member(int(memberid))
-            if member is None:
-                member_str = "Unknown"
-            else:
-                member_str = guild.get_member(int(memberid)).mention
-            attending_members += f"{member_str}\n"
-
-    if len(event["declined"]) == 0:
-        declined_members = "-"
-    else:
-        declined_members = ""
-        for memberid in event["declined"]:
-            member = guild.get_member(int(memberid))
-            if member is None:
-                member_str = "Unknown"
-            else:
-                member_str = guild.get_member(int(memberid)).mention
-            declined_members += f"{member_str}\n"
-
-    if len(event["maybe"]) == 0:
-        maybe_members = "-"
-    else:
-        maybe_members = ""
-        for memberid in event["maybe"]:
-            member = guild.get_member(int(memberid))
-            if member is None:
-                member_str = "Unknown"
-            else:
-                member_str = guild.get_member(int(memberid)).mention
-            maybe_members += f"{member_str}\n"
+    attending_members = render_member_list(guild, event["attending"])
+    declined_members = render_member_list(guild, event["declined"])
+    maybe_members = render_member_list(guild, event["maybe"])
+    waitlist = event.get("waitlist", {})
 
     if event["image"] is not None:
         emb.set_image(url=event["image"])
@@ -86,6 +96,8 @@ def get_event_embed(guild: discord.Guild, event: dict) -> discord.Embed:
     emb.add_field(name=f":white_check_mark: Accepted{attending_str}", value=attending_members, inline=True)
     emb.add_field(name=":x: Declined", value=declined_members, inline=True)
     emb.add_field(name=":grey_question: Tentative", value=maybe_members, inline=True)
+    if len(waitlist) != 0:
+        emb.add_field(name=f":hourglass: Waitlist ({len(waitlist)})", value=render_member_list(guild, waitlist), inline=False)
     emb.set_footer(text=f"Created by {autor_str}\nCreated on {createtime_str}")
     return emb
 
@@ -100,6 +112,60 @@ async def create_event_reactions(guild: discord.guild, post):
     await post.add_reaction(trash)
     return
     
+def new_event(event_id: int, creator: int, create_time: float, name: str, description: Optional[str], max_attendees: str, event_start: float, image: Optional[str], mention: Optional[int]) -> dict:
+    return {
+        "id": event_id,
+        "creator": creator,
+        "create_time": create_time,
+        "event_name": name,
+        "description": description,
+        "max_attendees": max_attendees,
+        "event_start": event_start,
+        "post_id": None,
+        "attending": {},
+        "declined": {},
+        "maybe": {},
+        "waitlist": {},
+        "image": image,
+        "remindersent": 0,
+        "mention": mention
+    }
+
+def validate_title(title: str) -> str:
+    title = title[0:199]
+    if len(title) <= 3:
+        raise BadArgument("This title is to short. Try again with atleast 3 characters!")
+    return title
+
+def validate_description(description: Optional[str]) -> Optional[str]:
+    if description is None or description.lower() == "none":
+        return None
+    return description[0:1599]
+
+def validate_max_attendees(max_attendees: str) -> str:
+    max_attendees = str(max_attendees).strip()
+    if not max_attendees.isdecimal():
+        raise BadArgument("The maximum number of attendees must be a number!")
+    return str(int(max_attendees))
+
+def parse_event_start(start: str) -> dt:
+    if not START_TIME.match(start):
+        raise BadArgument("The date format is not correct!")
+    try:
+        startDateTime = dt.strptime(start, '%Y-%m-%d %H:%M')
+    except ValueError:
+        raise BadArgument("The date format is not correct!")
+    if startDateTime < dt.now():
+        raise BadArgument("You can't create an event in the past!")
+    return startDateTime
+
+async def validate_image(image: Optional[str]) -> Optional[str]:
+    if image is None or image.lower() == "none":
+        return None
+    if not await valid_image(image):
+        raise BadArgument("That URL doesn't look like a proper image.")
+    return image
+
 async def valid_image(argument):
     search = IMAGE_LINKS.search(argument)
     if not search:
@@ -107,11 +173,32 @@ async def valid_image(argument):
     else:
         return True
 
-async def get_mentionable_role(guild: discord.Guild, role_name: str) -> discord.Role:
-    for role in guild.roles:
-        if role.name.lower() == role_name.lower():
-            if role.mentionable == True:
-                return role
-            else:
-                return False
-    return None
\ No newline at end of file
+async def get_mentionable_role(roles: RoleIndex, role_name: str) -> discord.Role:
+    role = roles.get_named(role_name)
+    if role is None:
+        return None
+    if role.mentionable == True:
+        return role
+    return False
+
+
+def forget_member(event: dict, member_id: int, anonymize_creator: bool = True) -> bool:
+    """Remove a member from the attendance of an event, and as its creator if asked. Returns whether the event changed."""
+    changed = False
+    for key in ("attending", "declined", "maybe", "waitlist"):
+        if str(member_id) in event.get(key, {}):
+            del event[key][str(member_id)]
+            changed = True
+    if anonymize_creator and int(event.get("creator", 0)) == int(member_id):
+        event["creator"] = 0
+        changed = True
+    return changed
+
+
+def resolve_member_names(guild: discord.Guild, member_ids) -> dict:
+    names = {}
+    for member_id in member_ids:
+        member = guild.get_member(int(member_id))
+        if member is not None:
+            names[int(member_id)] = member.display_name
+    return names
@@ -0,0 +1,142 @@
+from datetime import datetime as dt, timezone
+from typing import Iterable, Iterator, Optional
+
+
+def unfold_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Join folded iCalendar content lines, one logical line at a time"""
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.startswith((" ", "\t")) and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None and current != "":
+        yield current
+
+
+def unescape_text(value: str) -> str:
+    result = ""
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char == "\\" and i + 1 < len(value):
+            following = value[i + 1]
+            result += "\n" if following in ("n", "N") else following
+            i += 2
+            continue
+        result += char
+        i += 1
+    return result
+
+
+def parse_datetime(value: str, params: dict) -> Optional[str]:
+    """DTSTART value as `YYYY-MM-DD HH:MM` local time, the format the event wizard uses"""
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            start = dt.strptime(value, "%Y%m%d")
+        elif value.endswith("Z"):
+            start = dt.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        else:
+            # Floating time or a TZID, both taken as local time
+            start = dt.strptime(value[:15], "%Y%m%dT%H%M%S")
+    except ValueError:
+        return None
+    return start.strftime("%Y-%m-%d %H:%M")
+
+
+def iter_ics_events(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Stream the VEVENTs of an iCalendar file as import rows.
+
+    Rows use the same keys as CSV imports. Events without a start time get `None` as start.
+    """
+    row = None
+    for line in unfold_lines(lines):
+        if line == "BEGIN:VEVENT":
+            row = {"title": None, "start": None, "description": None}
+            continue
+        if line == "END:VEVENT":
+            if row is not None:
+                yield row
+            row = None
+            continue
+        if row is None or ":" not in line:
+            continue
+
+        name, value = line.split(":", 1)
+        params = {}
+        if ";" in name:
+            name, *param_list = name.split(";")
+            for param in param_list:
+                if "=" in param:
+                    key, param_value = param.split("=", 1)
+                    params[key.upper()] = param_value
+        name = name.upper()
+
+        if name == "SUMMARY":
+            row["title"] = unescape_text(value)
+        elif name == "DESCRIPTION":
+            row["description"] = unescape_text(value)
+        elif name == "DTSTART":
+            row["start"] = parse_datetime(value, params)
+        elif name == "X-EVENTBOARD-MAX-ATTENDEES":
+            row["max_attendees"] = value
+        elif name == "X-EVENTBOARD-MENTION":
+            row["mention"] = unescape_text(value)
+        elif name == "ATTACH" and value.startswith("http"):
+            row["image"] = value
+
+
+def escape_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line to lines of at most 75 octets"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+
+    folded = ""
+    current = b""
+    limit = 75
+    for char in line:
+        char_bytes = char.encode("utf-8")
+        if len(current) + len(char_bytes) > limit:
+            folded += current.decode("utf-8") + "\r\n "
+            current = b""
+            limit = 74
+        current += char_bytes
+    return folded + current.decode("utf-8") + "\r\n"
+
+
+def format_utc(timestamp: float) -> str:
+    return dt.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def build_vevent(guild_id: int, event: dict, url: Optional[str] = None) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:eventboard-{guild_id}-{event['id']}@discord",
+        f"DTSTAMP:{format_utc(dt.now().timestamp())}",
+        f"DTSTART:{format_utc(event['event_start'])}",
+        f"SEQUENCE:{event.get('revision', 0)}",
+        f"SUMMARY:{escape_text(event['event_name'])}",
+    ]
+    if event["description"] is not None:
+        lines.append(f"DESCRIPTION:{escape_text(event['description'])}")
+    if url is not None:
+        lines.append(f"URL:{url}")
+    lines.append("END:VEVENT")
+    return "".join(fold_line(line) for line in lines)
+
+
+def build_calendar(name: str, vevents: Iterable[str]) -> bytes:
+    calendar = fold_line("BEGIN:VCALENDAR") + fold_line("VERSION:2.0") + fold_line("PRODID:-//Burnacid//Eventboard//EN")
+    calendar += fold_line(f"X-WR-CALNAME:{escape_text(name)}")
+    calendar += "".join(vevents)
+    calendar += fold_line("END:VCALENDAR")
+    return calendar.encode("utf-8")
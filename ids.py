@@ -0,0 +1,45 @@
+import asyncio
+from typing import Dict, List
+
+import discord
+from redbot.core import Config
+
+# Ids reserved per Config write
+ID_BLOCK_SIZE = 20
+
+
+class EventIdAllocator:
+    """
+    Hands out event ids per guild from blocks reserved in Config.
+
+    `next_available_id` in Config is the end of the reserved block. It is written before any id of
+    the block is handed out, so ids are never reused after a restart. Ids left in a block when the
+    cog unloads are skipped, which only leaves gaps in the numbering.
+    """
+
+    def __init__(self, config: Config, block_size: int = ID_BLOCK_SIZE):
+        self.config = config
+        self.block_size = block_size
+        # guild id -> [next id, end of the reserved block]
+        self._blocks: Dict[int, List[int]] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+    async def allocate(self, guild: discord.Guild, count: int = 1) -> int:
+        """Reserve `count` consecutive ids, returns the first"""
+        lock = self._locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            block = self._blocks.get(guild.id)
+            if block is None or block[0] + count > block[1]:
+                if block is None:
+                    start = await self.config.guild(guild).next_available_id()
+                else:
+                    # Config already holds the end of the current block
+                    start = block[1]
+                end = start + max(self.block_size, count)
+                await self.config.guild(guild).next_available_id.set(end)
+                block = self._blocks[guild.id] = [start, end]
+
+            event_id = block[0]
+            block[0] += count
+            return event_id
+
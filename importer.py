@@ -0,0 +1,58 @@
+import csv
+import io
+from typing import Iterable, Iterator, Tuple
+
+from discord.ext.commands.errors import BadArgument
+
+from .ical import iter_ics_events
+
+IMPORT_FORMATS = ("csv", "ics")
+# Seconds between posting imported events, keeps the publisher clear of rate limits
+PUBLISH_PACE = 2
+
+
+def import_format(filename: str) -> str:
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension in IMPORT_FORMATS:
+        return extension
+    return None
+
+
+def iter_text_lines(data: bytes) -> Iterator[str]:
+    """Decode an upload line by line, so a byte that isn't UTF-8 can be pinned to its line"""
+    for number, line in enumerate(io.BytesIO(data), start=1):
+        try:
+            yield line.decode("utf-8-sig" if number == 1 else "utf-8")
+        except UnicodeDecodeError:
+            raise BadArgument(f"Line {number}: The file isn't UTF-8 encoded, nothing from this line on was read")
+
+
+def iter_csv_rows(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Stream the rows of a CSV file.
+
+    Expected columns are `title` and `start`, optionally `max_attendees`, `mention`, `image` and `description`.
+    """
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield {str(key).strip().lower(): value.strip() if isinstance(value, str) else value for key, value in row.items()}
+
+
+def iter_import_rows(data: bytes, file_format: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Numbered rows of an uploaded file, parsed one line at a time.
+
+    Raises BadArgument with the line or row number when the rest of the file can't be read.
+    """
+    lines = iter_text_lines(data)
+    if file_format == "csv":
+        rows = iter_csv_rows(lines)
+    else:
+        rows = iter_ics_events(lines)
+
+    number = 0
+    try:
+        for number, row in enumerate(rows, start=1):
+            yield number, row
+    except csv.Error as e:
+        raise BadArgument(f"Row {number + 1}: {e}, nothing from this row on was read")
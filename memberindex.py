@@ -0,0 +1,140 @@
+import bisect
+import difflib
+from typing import Dict, Iterable, List, Set, Tuple
+
+import discord
+
+# Candidates shown when a name doesn't match exactly
+MAX_CANDIDATES = 10
+# How close a typo has to be, see difflib.get_close_matches
+FUZZY_CUTOFF = 0.7
+# Typos considered are at most this many characters longer or shorter than the name
+MAX_LENGTH_DIFFERENCE = 3
+
+
+def member_keys(member: discord.Member) -> Set[str]:
+    keys = {member.name.lower(), f"{member.name}#{member.discriminator}".lower()}
+    if member.nick:
+        keys.add(member.nick.lower())
+    return keys
+
+
+class MemberIndex:
+    """
+    Sorted index of the lowercase names and nicknames of a guild's members.
+
+    Exact and prefix lookups are a binary search. Typos fall back to difflib on the names with the same
+    first character and a similar length, a typo in the first character isn't matched.
+    """
+
+    def __init__(self, members: Iterable[discord.Member] = ()):
+        self._entries: List[Tuple[str, int]] = []
+        self._keys: Dict[int, Set[str]] = {}
+        # first character -> name -> ids of the members with that name
+        self._initials: Dict[str, Dict[str, Set[int]]] = {}
+        for member in members:
+            keys = member_keys(member)
+            self._keys[member.id] = keys
+            self._entries.extend((key, member.id) for key in keys)
+            for key in keys:
+                self._initials.setdefault(key[:1], {}).setdefault(key, set()).add(member.id)
+        self._entries.sort()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, member: discord.Member) -> None:
+        self.remove(member.id)
+        keys = member_keys(member)
+        self._keys[member.id] = keys
+        for key in keys:
+            bisect.insort(self._entries, (key, member.id))
+            self._initials.setdefault(key[:1], {}).setdefault(key, set()).add(member.id)
+
+    def remove(self, member_id: int) -> None:
+        for key in self._keys.pop(member_id, ()):
+            index = bisect.bisect_left(self._entries, (key, member_id))
+            if index < len(self._entries) and self._entries[index] == (key, member_id):
+                del self._entries[index]
+            names = self._initials.get(key[:1], {})
+            names.get(key, set()).discard(member_id)
+            if key in names and len(names[key]) == 0:
+                del names[key]
+
+    def _prefix(self, prefix: str) -> Iterable[Tuple[str, int]]:
+        index = bisect.bisect_left(self._entries, (prefix, -1))
+        while index < len(self._entries) and self._entries[index][0].startswith(prefix):
+            yield self._entries[index]
+            index += 1
+
+    def search(self, query: str, limit: int = MAX_CANDIDATES) -> Tuple[List[int], bool]:
+        """
+        Ids of the members matching the query, best matches first.
+
+        Returns the ids and whether they are exact matches.
+        """
+        query = query.strip().lower()
+        if query == "":
+            return [], False
+
+        exact = []
+        prefixed = []
+        # Exact matches sort before every longer name with the same prefix
+        for key, member_id in self._prefix(query):
+            if key == query:
+                if member_id not in exact:
+                    exact.append(member_id)
+                continue
+            if len(exact) > 0 or len(prefixed) >= limit:
+                break
+            if member_id not in prefixed:
+                prefixed.append(member_id)
+        if len(exact) > 0:
+            return exact[:limit], True
+
+        if len(prefixed) > 0:
+            return prefixed, False
+
+        # Names that differ too much in length can't reach the cutoff
+        names = self._initials.get(query[:1], {})
+        candidates = [key for key in names if abs(len(key) - len(query)) <= MAX_LENGTH_DIFFERENCE]
+        found = []
+        for key in difflib.get_close_matches(query, candidates, n=limit, cutoff=FUZZY_CUTOFF):
+            member_id = min(names[key])
+            if member_id not in found:
+                found.append(member_id)
+        return found, False
+
+
+class MemberIndexes:
+    """Member indexes per guild, built on first use and kept current by the member listeners"""
+
+    def __init__(self):
+        self._indexes: Dict[int, MemberIndex] = {}
+
+    def get(self, guild: discord.Guild) -> MemberIndex:
+        if guild.id not in self._indexes:
+            self._indexes[guild.id] = MemberIndex(guild.members)
+        return self._indexes[guild.id]
+
+    def update(self, member: discord.Member) -> None:
+        index = self._indexes.get(member.guild.id)
+        if index is not None:
+            index.add(member)
+
+    def remove(self, member: discord.Member) -> None:
+        index = self._indexes.get(member.guild.id)
+        if index is not None:
+            index.remove(member.id)
+
+    def update_user(self, user: discord.User, guilds: Iterable[discord.Guild]) -> None:
+        """A username changed, every guild of the user has to know"""
+        for guild in guilds:
+            if guild.id not in self._indexes:
+                continue
+            member = guild.get_member(user.id)
+            if member is not None:
+                self._indexes[guild.id].add(member)
+
+    def drop(self, guild_id: int) -> None:
+        self._indexes.pop(guild_id, None)
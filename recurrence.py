@@ -0,0 +1,108 @@
+import calendar
+import re
+from datetime import timedelta, datetime as dt
+from typing import Optional, Union
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+NTH_NAMES = {"1st": 1, "first": 1, "2nd": 2, "second": 2, "3rd": 3, "third": 3, "4th": 4, "fourth": 4, "last": -1}
+
+WEEKLY = re.compile(r"^weekly(?: (\d{1,2}))?$", flags=re.I)
+EVERY_DAYS = re.compile(r"^(?:every )?(\d{1,3}) days?$|^days (\d{1,3})$", flags=re.I)
+NTH_WEEKDAY = re.compile(r"^(1st|first|2nd|second|3rd|third|4th|fourth|last) (\w+)$", flags=re.I)
+
+
+def parse_recurrence(text: str) -> Union[dict, None, bool]:
+    """
+    Parse a recurrence rule as typed in the wizard.
+
+    Returns the rule, `None` when the event doesn't repeat or `False` when the input isn't understood.
+    """
+    text = " ".join(text.strip().lower().split())
+    if text == "none":
+        return None
+
+    match = WEEKLY.match(text)
+    if match:
+        interval = int(match.group(1) or 1)
+        if interval < 1:
+            return False
+        return {"type": "weekly", "interval": interval}
+
+    match = EVERY_DAYS.match(text)
+    if match:
+        interval = int(match.group(1) or match.group(2))
+        if interval < 1:
+            return False
+        return {"type": "days", "interval": interval}
+
+    match = NTH_WEEKDAY.match(text)
+    if match:
+        weekday = match.group(2)
+        if weekday.endswith("s"):
+            weekday = weekday[:-1]
+        if weekday not in WEEKDAYS:
+            return False
+        return {"type": "nthweekday", "nth": NTH_NAMES[match.group(1)], "weekday": WEEKDAYS.index(weekday)}
+
+    return False
+
+
+def describe_recurrence(rule: dict) -> str:
+    if rule["type"] == "weekly":
+        if rule["interval"] == 1:
+            return "Every week"
+        return f"Every {rule['interval']} weeks"
+
+    if rule["type"] == "days":
+        if rule["interval"] == 1:
+            return "Every day"
+        return f"Every {rule['interval']} days"
+
+    nth = {1: "1st", 2: "2nd", 3: "3rd", 4: "4th", -1: "last"}[rule["nth"]]
+    return f"Every {nth} {WEEKDAYS[rule['weekday']].capitalize()} of the month"
+
+
+def nth_weekday_of_month(year: int, month: int, weekday: int, nth: int) -> Optional[int]:
+    """Day of the month of the nth weekday, or None if the month doesn't have one"""
+    first_weekday, days_in_month = calendar.monthrange(year, month)
+    if nth == -1:
+        last_weekday = (first_weekday + days_in_month - 1) % 7
+        return days_in_month - ((last_weekday - weekday) % 7)
+
+    day = 1 + ((weekday - first_weekday) % 7) + (nth - 1) * 7
+    if day > days_in_month:
+        return None
+    return day
+
+
+def next_occurrence(rule: dict, previous_start: float) -> float:
+    """
+    Start timestamp of the occurrence following `previous_start`.
+
+    Works on local wall clock time, the same way event start times are entered, so a raid at 20:00 stays at 20:00 across DST changes.
+    """
+    previous = dt.fromtimestamp(previous_start)
+
+    if rule["type"] == "weekly":
+        return (previous + timedelta(weeks=rule["interval"])).timestamp()
+
+    if rule["type"] == "days":
+        return (previous + timedelta(days=rule["interval"])).timestamp()
+
+    year, month = previous.year, previous.month
+    while True:
+        month += 1
+        if month > 12:
+            month = 1
+            year += 1
+        day = nth_weekday_of_month(year, month, rule["weekday"], rule["nth"])
+        if day is not None:
+            return previous.replace(year=year, month=month, day=day).timestamp()
+
+
+def next_occurrence_after(rule: dict, previous_start: float, after: float) -> float:
+    """First occurrence following `previous_start` that starts after `after`"""
+    start = next_occurrence(rule, previous_start)
+    while start <= after:
+        start = next_occurrence(rule, start)
+    return start
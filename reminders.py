@@ -0,0 +1,91 @@
+import re
+from typing import List, Optional
+
+from discord.ext.commands.errors import BadArgument
+
+# Stages are tracked as bits of the event's `remindersent` value
+MAX_STAGES = 8
+OFFSET = re.compile(r"^(\d{1,5})([mhd]?)$", flags=re.I)
+UNITS = {"": 1, "m": 1, "h": 60, "d": 1440}
+
+
+def parse_reminder_schedule(text: str) -> List[int]:
+    """
+    Parse reminder offsets like `24h 1h 0`. Bare numbers are minutes.
+
+    Returns the offsets in minutes before start, earliest reminder first. `none` gives an empty schedule.
+    """
+    text = text.strip().lower()
+    if text in ("none", "off", "-1"):
+        return []
+
+    stages = set()
+    for part in text.replace(",", " ").split():
+        match = OFFSET.match(part)
+        if not match:
+            raise BadArgument(f"`{part}` isn't a reminder offset. Use minutes or a number with m, h or d like `24h`.")
+        stages.add(int(match.group(1)) * UNITS[match.group(2)])
+
+    if len(stages) == 0:
+        raise BadArgument("There are no reminder offsets in there")
+    if len(stages) > MAX_STAGES:
+        raise BadArgument(f"An event can have at most {MAX_STAGES} reminders")
+    return sorted(stages, reverse=True)
+
+
+def migrate_reminder(reminder: int) -> List[int]:
+    """Schedule equivalent to the old single `reminder` setting. Its sent flag is the bit of stage 0."""
+    if int(reminder) < 0:
+        return []
+    return [int(reminder)]
+
+
+def describe_offset(minutes: int) -> str:
+    if minutes == 0:
+        return "at start"
+    if minutes % 1440 == 0:
+        return f"{minutes // 1440}d before"
+    if minutes % 60 == 0:
+        return f"{minutes // 60}h before"
+    return f"{minutes}m before"
+
+
+def describe_reminder_schedule(stages: List[int]) -> str:
+    if len(stages) == 0:
+        return "No reminders"
+    return ", ".join(describe_offset(minutes) for minutes in stages)
+
+
+def event_reminder_schedule(event: dict, guild_stages: List[int]) -> List[int]:
+    """The event's own schedule when it overrides the guild's"""
+    stages = event.get("reminders")
+    if stages is None:
+        return guild_stages
+    return stages
+
+
+def passed_stages(stages: List[int], event_start: float, now: float) -> int:
+    """Bitmask of the stages whose time has come"""
+    mask = 0
+    for index, minutes in enumerate(stages):
+        if event_start - minutes * 60 <= now:
+            mask |= 1 << index
+    return mask
+
+
+def due_stages(stages: List[int], event_start: float, sent: int, now: float) -> int:
+    """
+    Bitmask of the stages that are due and not sent yet.
+
+    Stages that were missed, for example of an event created an hour before it starts, are due together
+    with the latest one so members get a single reminder.
+    """
+    return passed_stages(stages, event_start, now) & ~int(sent)
+
+
+def next_stage(stages: List[int], sent: int) -> Optional[int]:
+    """Offset of the next reminder that still has to go out"""
+    for index, minutes in enumerate(stages):
+        if not int(sent) & (1 << index):
+            return minutes
+    return None
@@ -0,0 +1,420 @@
+import asyncio
+import copy
+import json
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+import logging
+
+log = logging.getLogger("red.burnacid.eventboard")
+
+RECORD_VERSION = 1
+
+
+def serialize_member(member) -> Optional[dict]:
+    """Ids only, names aren't needed to replay and stay out of recordings"""
+    if member is None:
+        return None
+    return {"id": member.id, "bot": member.bot}
+
+
+def serialize_reaction(event_type: str, payload: discord.RawReactionActionEvent) -> dict:
+    return {
+        "type": event_type,
+        "guild_id": payload.guild_id,
+        "channel_id": payload.channel_id,
+        "message_id": payload.message_id,
+        "user_id": payload.user_id,
+        "emoji": {"name": payload.emoji.name, "id": payload.emoji.id},
+        "member": serialize_member(getattr(payload, "member", None)),
+    }
+
+
+def serialize_message(message: discord.Message) -> dict:
+    return {
+        "type": "message",
+        "guild_id": None if message.guild is None else message.guild.id,
+        "channel_id": message.channel.id,
+        "message_id": message.id,
+        "author": serialize_member(message.author),
+        "content": message.content,
+    }
+
+
+class TrafficRecorder:
+    """
+    Writes the gateway events that reach the eventboard logic to a JSONL file.
+
+    Messages are only recorded in event channels and as replies to open wizards. Members are recorded
+    by id, without names.
+
+    The first line is a snapshot of the live events, every following line is one reaction or message
+    event with its offset in seconds from the start of the recording.
+    """
+
+    def __init__(self):
+        self.path: Optional[Path] = None
+        self.count = 0
+        self._fp = None
+        self._start = 0.0
+
+    @property
+    def recording(self) -> bool:
+        return self._fp is not None
+
+    def start(self, path: Path, snapshot: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.count = 0
+        self._fp = path.open("w", encoding="utf-8")
+        self._start = time.monotonic()
+        self._write({"type": "snapshot", "version": RECORD_VERSION, "guilds": snapshot})
+
+    def stop(self) -> int:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        return self.count
+
+    def record_reaction(self, event_type: str, payload: discord.RawReactionActionEvent) -> None:
+        if self._fp is None:
+            return
+        self._record(serialize_reaction(event_type, payload))
+
+    def record_message(self, message: discord.Message) -> None:
+        if self._fp is None:
+            return
+        self._record(serialize_message(message))
+
+    def _record(self, entry: dict) -> None:
+        entry["t"] = round(time.monotonic() - self._start, 4)
+        self._write(entry)
+        self.count += 1
+
+    def _write(self, entry: dict) -> None:
+        self._fp.write(json.dumps(entry) + "\n")
+
+
+class FakeAPI:
+    """Counts the calls made to the fake Discord layer and gives each a fixed latency"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = Counter()
+
+    async def call(self, name: str) -> None:
+        self.calls[name] += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+
+class FakeRole:
+    def __init__(self, role_id: int):
+        self.id = role_id
+        self.name = f"role-{role_id}"
+        self.mention = f"<@&{role_id}>"
+        self.mentionable = True
+
+
+class FakeMember:
+    def __init__(self, api: FakeAPI, guild: "FakeGuild", data: dict):
+        self._api = api
+        self.guild = guild
+        self.id = int(data["id"])
+        self.name = data.get("name") or str(self.id)
+        self.nick = data.get("nick")
+        self.bot = data.get("bot", False)
+        self.display_name = self.nick or self.name
+        self.mention = f"<@{self.id}>"
+        self.dm_channel = None
+
+    async def create_dm(self) -> "FakeChannel":
+        await self._api.call("create_dm")
+        self.dm_channel = FakeChannel(self._api, None, self.id, "dm")
+        return self.dm_channel
+
+
+class FakeMessage:
+    def __init__(self, api: FakeAPI, channel: "FakeChannel", message_id: int, content: Optional[str] = None, embed: discord.Embed = None, author: FakeMember = None):
+        self._api = api
+        self.channel = channel
+        self.guild = channel.guild
+        self.id = message_id
+        self.content = content
+        self.embeds = [] if embed is None else [embed]
+        self.author = author
+        self.reactions = Counter()
+
+    async def edit(self, content: Optional[str] = None, embed: discord.Embed = None, **kwargs) -> None:
+        await self._api.call("edit_message")
+        self.content = content
+        self.embeds = [] if embed is None else [embed]
+
+    async def remove_reaction(self, emoji, member) -> None:
+        await self._api.call("remove_reaction")
+
+    async def add_reaction(self, emoji) -> None:
+        await self._api.call("add_reaction")
+
+    async def delete(self, delay: Optional[float] = None) -> None:
+        await self._api.call("delete_message")
+
+
+class FakeChannel:
+    def __init__(self, api: FakeAPI, guild: Optional["FakeGuild"], channel_id: int, kind: str = "text"):
+        self._api = api
+        self.guild = guild
+        self.id = channel_id
+        self.kind = kind
+        self.messages: Dict[int, FakeMessage] = {}
+        self._next_id = channel_id * 1000
+
+    async def send(self, content: Optional[str] = None, embed: discord.Embed = None, delete_after: Optional[float] = None, **kwargs) -> FakeMessage:
+        await self._api.call("send_dm" if self.kind == "dm" else "send_message")
+        self._next_id += 1
+        message = FakeMessage(self._api, self, self._next_id, content, embed)
+        if self.kind != "dm":
+            self.messages[message.id] = message
+        return message
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        await self._api.call("fetch_message")
+        if message_id not in self.messages:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+        return self.messages[message_id]
+
+
+class FakeGuild:
+    def __init__(self, api: FakeAPI, guild_id: int):
+        self._api = api
+        self.id = guild_id
+        self.owner = None
+        self.roles = []
+        self.members: Dict[int, FakeMember] = {}
+        self.channels: Dict[int, FakeChannel] = {}
+        self._roles: Dict[int, FakeRole] = {}
+
+    def add_member(self, data: dict) -> FakeMember:
+        member_id = int(data["id"])
+        if member_id not in self.members or data.get("name"):
+            self.members[member_id] = FakeMember(self._api, self, data)
+        return self.members[member_id]
+
+    def add_channel(self, channel_id: int) -> FakeChannel:
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(self._api, self, channel_id)
+        return self.channels[channel_id]
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self.members.get(int(member_id))
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(int(channel_id))
+
+    def get_role(self, role_id: int) -> FakeRole:
+        if int(role_id) not in self._roles:
+            self._roles[int(role_id)] = FakeRole(int(role_id))
+        return self._roles[int(role_id)]
+
+
+class FakeBot:
+    """Just enough of the bot for the cog's listeners"""
+
+    def __init__(self, guilds: Dict[int, FakeGuild]):
+        self.loop = asyncio.get_event_loop()
+        self.user = SimpleNamespace(id=0, name="replay", bot=True)
+        self.guilds = guilds
+        self.shard_count = 1
+        self.shard_ids = None
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return self.guilds.get(int(guild_id))
+
+    def get_cog(self, name: str):
+        # Keeps the cog's background loops from running during a replay
+        return None
+
+    async def wait_until_red_ready(self) -> None:
+        pass
+
+    async def wait_until_ready(self) -> None:
+        pass
+
+    async def is_owner(self, user) -> bool:
+        return False
+
+    async def is_admin(self, member) -> bool:
+        return False
+
+    async def is_mod(self, member) -> bool:
+        return False
+
+
+def forget_member_recordings(directory: Path, member_id: int) -> int:
+    """Delete the recordings and replay reports that mention the member. Returns the number of files deleted."""
+    if not directory.is_dir():
+        return 0
+    deleted = 0
+    for path in directory.iterdir():
+        if not path.is_file():
+            continue
+        with path.open("r", encoding="utf-8", errors="replace") as fp:
+            if not any(str(member_id) in line for line in fp):
+                continue
+        path.unlink()
+        deleted += 1
+    return deleted
+
+
+def read_recording(path: Path) -> Tuple[dict, List[dict]]:
+    with path.open("r", encoding="utf-8") as fp:
+        snapshot = json.loads(fp.readline())
+        if snapshot.get("type") != "snapshot" or snapshot.get("version") != RECORD_VERSION:
+            raise ValueError("This isn't an eventboard recording")
+        entries = [json.loads(line) for line in fp if line.strip()]
+    return snapshot["guilds"], entries
+
+
+def build_fake_layer(api: FakeAPI, snapshot: dict, entries: List[dict]) -> Dict[int, FakeGuild]:
+    guilds = {}
+    for guild_id, guild_data in snapshot.items():
+        guild = guilds[int(guild_id)] = FakeGuild(api, int(guild_id))
+        for member in guild_data["members"]:
+            guild.add_member(member)
+        if guild_data["event_channel"] is not None:
+            channel = guild.add_channel(int(guild_data["event_channel"]))
+            for post_id in guild_data["events"]:
+                # Posts start out rendered, like the live posts were
+                channel.messages[int(post_id)] = FakeMessage(api, channel, int(post_id), embed=discord.Embed())
+
+    for entry in entries:
+        if entry["guild_id"] is None or int(entry["guild_id"]) not in guilds:
+            continue
+        guild = guilds[int(entry["guild_id"])]
+        guild.add_channel(int(entry["channel_id"]))
+        member = entry.get("member") if entry["type"] != "message" else entry["author"]
+        if member is not None:
+            guild.add_member(member)
+        elif entry.get("user_id") is not None:
+            guild.add_member({"id": entry["user_id"]})
+    return guilds
+
+
+def percentile(values: List[float], share: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def replay_recording(path: Path, speed: float = 1.0, api_latency: float = 0.0) -> dict:
+    """
+    Feed a recording into a sandboxed copy of the cog on top of the fake Discord layer.
+
+    `speed` 1 replays at the recorded pace, 2 twice as fast, 0 as fast as possible. The sandbox keeps
+    its data apart from the live cog and is cleared afterwards. Returns the report.
+    """
+    from .eventboard import Eventboard
+
+    class EventboardReplay(Eventboard):
+        """Separate Config and data path, named after the class"""
+
+    snapshot, entries = read_recording(path)
+    api = FakeAPI(api_latency)
+    guilds = build_fake_layer(api, snapshot, entries)
+    bot = FakeBot(guilds)
+
+    cog = EventboardReplay(bot)
+    await cog.config.clear_all()
+    await cog.storage_ready.wait()
+    for guild_id, guild_data in snapshot.items():
+        guild = guilds[int(guild_id)]
+        await cog.config.guild(guild).event_channel.set(guild_data["event_channel"])
+        events = copy.deepcopy(guild_data["events"])
+        await cog.store.save_events(guild, list(events.values()))
+        cog.event_cache.register(guild.id)
+
+    handlers = {"add": cog.on_raw_reaction_add, "remove": cog.on_raw_reaction_remove}
+    latencies = []
+    skipped = Counter()
+    errors = Counter()
+
+    async def dispatch(entry: dict) -> None:
+        guild = bot.get_guild(entry["guild_id"]) if entry["guild_id"] is not None else None
+        if entry["type"] == "message":
+            channel = guild.get_channel(entry["channel_id"]) if guild is not None else FakeChannel(api, None, entry["channel_id"], "dm")
+            author = guild.get_member(entry["author"]["id"]) if guild is not None else FakeMember(api, None, entry["author"])
+            message = FakeMessage(api, channel, entry["message_id"], entry["content"], author=author)
+            handler, args = cog.on_message, (message,)
+        else:
+            member = None if entry["member"] is None or guild is None else guild.get_member(entry["member"]["id"])
+            payload = SimpleNamespace(
+                guild_id=entry["guild_id"],
+                channel_id=entry["channel_id"],
+                message_id=entry["message_id"],
+                user_id=entry["user_id"],
+                emoji=SimpleNamespace(**entry["emoji"]),
+                member=member,
+            )
+            handler, args = handlers[entry["type"]], (payload,)
+
+        started = time.monotonic()
+        try:
+            await handler(*args)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+            log.debug("Replayed event failed", exc_info=e)
+        latencies.append(time.monotonic() - started)
+
+    tasks = []
+    replay_start = time.monotonic()
+    try:
+        for entry in entries:
+            if entry["type"] != "message" and entry["emoji"]["name"] == "🗑️":
+                # Deleting waits on a DM conversation
+                skipped["trash"] += 1
+                continue
+            if speed > 0:
+                delay = entry["t"] / speed - (time.monotonic() - replay_start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(bot.loop.create_task(dispatch(entry)))
+        await asyncio.gather(*tasks)
+        duration = time.monotonic() - replay_start
+
+        state = {}
+        for guild_id, events in cog.event_cache.resident().items():
+            for post_id, event in events.items():
+                state[f"{guild_id}/{event['id']}"] = {
+                    "event_name": event["event_name"],
+                    "attending": sorted(event["attending"]),
+                    "declined": sorted(event["declined"]),
+                    "maybe": sorted(event["maybe"]),
+                    "waitlist": list(event.get("waitlist", {})),
+                }
+    finally:
+        cog.cog_unload()
+        await asyncio.sleep(0)
+        await cog.config.clear_all()
+
+    return {
+        "recording": path.name,
+        "events_replayed": len(latencies),
+        "skipped": dict(skipped),
+        "errors": dict(errors),
+        "duration": round(duration, 3),
+        "api_calls": dict(api.calls),
+        "latency": {
+            "p50": round(percentile(latencies, 0.5), 4),
+            "p90": round(percentile(latencies, 0.9), 4),
+            "p99": round(percentile(latencies, 0.99), 4),
+            "max": round(max(latencies, default=0.0), 4),
+        },
+        "state": state,
+    }
@@ -0,0 +1,49 @@
+from typing import Collection, Dict, List, Optional
+
+import discord
+
+
+class RoleIndex:
+    """Roles of a guild by lowercase name, with the mentionable roles in role order"""
+
+    def __init__(self, roles: List[discord.Role]):
+        # Roles can share a name, they are kept in role order
+        self.by_name: Dict[str, List[discord.Role]] = {}
+        self.mentionable: List[discord.Role] = []
+        for role in roles:
+            self.by_name.setdefault(role.name.lower(), []).append(role)
+            if role.mentionable:
+                self.mentionable.append(role)
+
+    def get_named(self, role_name: str) -> Optional[discord.Role]:
+        """First role with the name, same as a scan of guild.roles"""
+        roles = self.by_name.get(role_name.lower())
+        if not roles:
+            return None
+        return roles[0]
+
+    def find_allowed(self, role_name: str, role_ids: Collection[str]) -> Optional[discord.Role]:
+        """First role with the name among the allowed role ids"""
+        for role in self.by_name.get(role_name.lower(), []):
+            if str(role.id) in role_ids:
+                return role
+        return None
+
+
+class RoleIndexes:
+    """
+    Role indexes per guild.
+
+    An index is built on first use and dropped by the role listeners, the next lookup rebuilds it.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[int, RoleIndex] = {}
+
+    def get(self, guild: discord.Guild) -> RoleIndex:
+        if guild.id not in self._indexes:
+            self._indexes[guild.id] = RoleIndex(guild.roles)
+        return self._indexes[guild.id]
+
+    def invalidate(self, guild: discord.Guild) -> None:
+        self._indexes.pop(guild.id, None)
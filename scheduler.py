@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import itertools
+from collections import Counter, defaultdict, deque
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+import logging
+
+log = logging.getLogger("red.burnacid.eventboard")
+
+# Priority classes, lower goes first
+PRIORITY_POST = 0
+PRIORITY_REACTION = 1
+PRIORITY_REMINDER = 2
+PRIORITY_NOTIFICATION = 3
+PRIORITY_MODERATION = 4
+
+# Concurrent calls allowed per route, by the part of the route before the colon
+ROUTE_BUDGETS = {"post": 2, "reaction": 2, "dm": 4, "notice": 1}
+
+
+class OutboundJob:
+    __slots__ = ("priority", "seq", "route", "key", "factory", "future")
+
+    def __init__(self, priority: int, seq: int, route: str, key: Optional[Hashable], factory: Callable[[], Awaitable], future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.route = route
+        self.key = key
+        self.factory = factory
+        self.future = future
+
+    def __lt__(self, other: "OutboundJob") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundScheduler:
+    """
+    Queue for the calls the cog makes to the Discord API.
+
+    Jobs run by priority class, oldest first within a class. Every route (`post:<channel id>`, `dm`, ...)
+    has its own concurrency budget, a job whose route is busy is parked without holding up other routes.
+    A job submitted with a key replaces the queued job with the same key, its caller gets `None`.
+    """
+
+    def __init__(self, max_in_flight: int = 8, budgets: Dict[str, int] = None):
+        self.max_in_flight = max_in_flight
+        self.budgets = ROUTE_BUDGETS if budgets is None else budgets
+        self.metrics = Counter()
+        self._heap = []
+        self._seq = itertools.count()
+        self._queued_keys: Dict[Hashable, OutboundJob] = {}
+        self._parked = defaultdict(deque)
+        self._in_flight = Counter()
+        self._running = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self) -> int:
+        return len(self._heap) + sum(len(parked) for parked in self._parked.values())
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_event_loop().create_task(self._dispatch())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for job in itertools.chain(self._heap, *self._parked.values()):
+            job.future.cancel()
+        self._heap.clear()
+        self._parked.clear()
+        self._queued_keys.clear()
+
+    def budget(self, route: str) -> int:
+        return self.budgets.get(route.split(":", 1)[0], 1)
+
+    def submit(self, priority: int, route: str, factory: Callable[[], Awaitable], key: Optional[Hashable] = None) -> asyncio.Future:
+        """Queue a call. `factory` creates the coroutine once the job gets its turn."""
+        future = asyncio.get_event_loop().create_future()
+        if key is not None:
+            previous = self._queued_keys.pop(key, None)
+            if previous is not None and not previous.future.done():
+                previous.future.set_result(None)
+                self.metrics["jobs_superseded"] += 1
+
+        job = OutboundJob(priority, next(self._seq), route, key, factory, future)
+        if key is not None:
+            self._queued_keys[key] = job
+        heapq.heappush(self._heap, job)
+        self.metrics["jobs_queued"] += 1
+        self._wakeup.set()
+        return future
+
+    async def run(self, priority: int, route: str, factory: Callable[[], Awaitable], key: Optional[Hashable] = None):
+        """Queue a call and wait for its result"""
+        return await self.submit(priority, route, factory, key)
+
+    async def _dispatch(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._heap and self._running < self.max_in_flight:
+                job = heapq.heappop(self._heap)
+                if job.future.done():
+                    # Superseded or cancelled while queued
+                    continue
+                if self._in_flight[job.route] >= self.budget(job.route):
+                    self._parked[job.route].append(job)
+                    continue
+                self._start(job)
+
+    def _start(self, job: OutboundJob) -> None:
+        if job.key is not None and self._queued_keys.get(job.key) is job:
+            del self._queued_keys[job.key]
+        self._in_flight[job.route] += 1
+        self._running += 1
+        asyncio.get_event_loop().create_task(self._execute(job))
+
+    async def _execute(self, job: OutboundJob) -> None:
+        try:
+            result = await job.factory()
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as e:
+            self.metrics["jobs_failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.metrics["jobs_done"] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._running -= 1
+            self._in_flight[job.route] -= 1
+            if self._in_flight[job.route] <= 0:
+                del self._in_flight[job.route]
+            parked = self._parked.pop(job.route, None)
+            if parked:
+                # Back in the queue, they keep their place within their priority class
+                for parked_job in parked:
+                    heapq.heappush(self._heap, parked_job)
+            self._wakeup.set()
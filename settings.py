@@ -0,0 +1,68 @@
+import discord
+from redbot.core import Config
+
+from .reminders import migrate_reminder
+
+
+class GuildSettings:
+    """
+    Snapshot of the guild settings that maintenance and the listeners read.
+
+    Loaded once per guild and dropped by the commands that change any of these settings.
+    """
+
+    __slots__ = ("event_channel", "autodelete", "reminders", "mention_all", "mentions", "notifications", "digests")
+
+    def __init__(self, event_channel, autodelete: int, reminders: list, mention_all: int, mentions: dict, notifications: dict, digests: dict):
+        self.event_channel = event_channel
+        self.autodelete = autodelete
+        self.reminders = reminders
+        self.mention_all = mention_all
+        self.mentions = mentions
+        self.notifications = notifications
+        self.digests = digests
+
+    @classmethod
+    async def load(cls, config: Config, guild: discord.Guild) -> "GuildSettings":
+        guild_config = config.guild(guild)
+        reminders = await guild_config.reminders()
+        if reminders is None:
+            # Not migrated yet, see migrate_reminder_settings
+            reminders = migrate_reminder(await guild_config.reminder())
+        notifications = {
+            "eventstart": await guild_config.notifications_eventstart(),
+            "signin": await guild_config.notifications_signin(),
+            "signout": await guild_config.notifications_signout(),
+        }
+        return cls(
+            event_channel=await guild_config.event_channel(),
+            autodelete=int(await guild_config.autodelete()),
+            reminders=reminders,
+            mention_all=await guild_config.mention_all(),
+            mentions=await guild_config.mentions(),
+            notifications=notifications,
+            digests=await guild_config.notifications_digest(),
+        )
+
+    def wants_notification(self, member_id: int, typeOfNotification: str) -> int:
+        return self.notifications[typeOfNotification].get(str(member_id), 1)
+
+    def digest_interval(self, member_id: int) -> int:
+        """Minutes between sign in/out digests of the member, 0 for a DM per change"""
+        return int(self.digests.get(str(member_id), 0))
+
+
+async def migrate_reminder_settings(config: Config) -> int:
+    """
+    Give guilds from before reminder schedules a schedule with their single reminder offset.
+
+    Returns the number of guilds migrated.
+    """
+    migrated = 0
+    for guild_id, guild_data in (await config.all_guilds()).items():
+        if guild_data.get("reminders") is not None:
+            continue
+        reminder = guild_data.get("reminder", -1)
+        await config.guild(discord.Object(id=int(guild_id))).reminders.set(migrate_reminder(reminder))
+        migrated += 1
+    return migrated
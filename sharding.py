@@ -0,0 +1,5 @@
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """The shard Discord assigns a guild to"""
+    if shard_count <= 1:
+        return 0
+    return (int(guild_id) >> 22) % shard_count
@@ -0,0 +1,86 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from .replay import FakeAPI, FakeBot, FakeGuild
+
+import logging
+
+log = logging.getLogger("red.burnacid.eventboard")
+
+
+def fake_guild_ids(guild_count: int) -> List[int]:
+    """Snowflakes with spread out timestamps, the shard of a guild is taken from those bits"""
+    return [(((index * 2654435761) % (1 << 41)) << 22) | index for index in range(guild_count)]
+
+
+async def simulate_sharded_maintenance(shard_count: int, process_count: int = 1, guild_count: int = 1000) -> dict:
+    """
+    Run the maintenance guild selection of every simulated shard and bot process against a fake bot.
+
+    The processes share one Config, like a cluster on one backend. Every fake bot sees every guild, so the
+    shard filter alone has to keep the processes apart. Raises AssertionError when a guild is maintained
+    by no shard or by more than one. Returns the report.
+
+    Meant for the dev cog, for example `[p]debug await __import__("eventboard.shardsim").shardsim.simulate_sharded_maintenance(4, 2)`
+    """
+    from .eventboard import Eventboard
+
+    class EventboardShardSim(Eventboard):
+        """Separate Config and data path, named after the class"""
+
+    if shard_count < 1 or process_count < 1:
+        raise ValueError("The number of shards and processes must be at least 1")
+
+    api = FakeAPI()
+    guilds: Dict[int, FakeGuild] = {}
+    for guild_id in fake_guild_ids(guild_count):
+        guild = guilds[guild_id] = FakeGuild(api, guild_id)
+        guild.add_channel(guild_id + 1)
+
+    cogs = []
+    # guild id -> (process, shard) of every selection
+    maintained: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    processes = {}
+    try:
+        for process_id in range(process_count):
+            bot = FakeBot(guilds)
+            bot.shard_count = shard_count
+            # Shards are spread over the processes round robin
+            bot.shard_ids = [shard_id for shard_id in range(shard_count) if shard_id % process_count == process_id]
+            cogs.append(EventboardShardSim(bot))
+
+        await cogs[0].config.clear_all()
+        for guild in guilds.values():
+            await cogs[0].config.guild(guild).event_channel.set(guild.id + 1)
+
+        for process_id, cog in enumerate(cogs):
+            await cog.storage_ready.wait()
+            for guild_id in guilds:
+                cog.event_cache.register(guild_id)
+
+            process_shard_count, shard_ids = cog.local_shards()
+            processes[process_id] = {}
+            for shard_id in shard_ids:
+                selected = await cog.shard_guilds(shard_id, process_shard_count)
+                processes[process_id][shard_id] = len(selected)
+                for guild, channel in selected:
+                    maintained[guild.id].append((process_id, shard_id))
+    finally:
+        for cog in cogs:
+            cog.cog_unload()
+        await asyncio.sleep(0)
+        if len(cogs) > 0:
+            await cogs[0].config.clear_all()
+
+    missing = [guild_id for guild_id in guilds if guild_id not in maintained]
+    duplicated = {guild_id: selections for guild_id, selections in maintained.items() if len(selections) > 1}
+    if len(missing) > 0 or len(duplicated) > 0:
+        raise AssertionError(f"{len(missing)} guilds are maintained by no shard and {len(duplicated)} by more than one, for example {(missing + list(duplicated))[:5]}")
+
+    log.debug(f"Every one of the {len(guilds)} guilds is maintained by exactly one of {shard_count} shards")
+    return {
+        "guilds": len(guilds),
+        "shards": shard_count,
+        "processes": processes,
+    }
@@ -0,0 +1,33 @@
+from typing import Optional
+
+# Signing out of an event this close to its start counts as a no-show
+NOSHOW_WINDOW = 3600
+
+
+def new_member_stats() -> dict:
+    return {"signups": 0, "signouts": 0, "noshows": 0, "attended": 0}
+
+
+def new_guild_stats() -> dict:
+    return {"members": {}, "events": {"finished": 0, "capped": 0, "fill_sum": 0.0, "attended": 0}}
+
+
+def attendance_rate(member_stats: dict) -> Optional[float]:
+    """Share of sign ups that were still signed up when the event finished"""
+    if member_stats["signups"] == 0:
+        return None
+    return min(1.0, member_stats["attended"] / member_stats["signups"])
+
+
+def fill_rate(event: dict) -> Optional[float]:
+    """Share of the available spots taken, None for events without a maximum"""
+    max_attendees = int(event["max_attendees"])
+    if max_attendees == 0:
+        return None
+    return len(event["attending"]) / max_attendees
+
+
+def average_fill_rate(guild_stats: dict) -> Optional[float]:
+    if guild_stats["events"]["capped"] == 0:
+        return None
+    return guild_stats["events"]["fill_sum"] / guild_stats["events"]["capped"]
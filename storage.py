@@ -0,0 +1,208 @@
+import asyncio
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import discord
+from redbot.core import Config
+
+import logging
+
+log = logging.getLogger("red.burnacid.eventboard")
+
+# Event keys holding member maps, stored as attendance rows by the SQLite backend
+ATTENDANCE = ("attending", "declined", "maybe", "waitlist")
+
+
+class ConfigEventStore:
+    """Events stored in the `events` dict of the guild config"""
+
+    name = "config"
+
+    def __init__(self, config: Config):
+        self.config = config
+
+    async def load_events(self, guild: discord.Guild) -> Dict[str, dict]:
+        return await self.config.guild(guild).events()
+
+    async def load_event(self, guild: discord.Guild, post_id: str) -> Optional[dict]:
+        try:
+            return await self.config.guild(guild).events.get_raw(str(post_id))
+        except KeyError:
+            return None
+
+    async def save_event(self, guild: discord.Guild, event: dict) -> None:
+        await self.config.guild(guild).events.set_raw(str(event["post_id"]), value=event)
+
+    async def save_events(self, guild: discord.Guild, events: List[dict]) -> None:
+        async with self.config.guild(guild).events() as event_list:
+            for event in events:
+                event_list[str(event["post_id"])] = event
+
+    async def save_attendance(self, guild: discord.Guild, event: dict, member_id: int) -> None:
+        await self.save_event(guild, event)
+
+    async def delete_event(self, guild: discord.Guild, post_id: str) -> Optional[dict]:
+        async with self.config.guild(guild).events() as event_list:
+            return event_list.pop(str(post_id), None)
+
+    async def clear(self, guild: discord.Guild) -> None:
+        await self.config.guild(guild).events.set({})
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteEventStore:
+    """
+    Events stored in a SQLite database in WAL mode.
+
+    Event fields are kept as a JSON document per row, attendance is kept as one row per member
+    so signups only touch a single row. All queries run on one worker thread.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="eventboard-sqlite")
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                post_id INTEGER PRIMARY KEY,
+                guild_id INTEGER NOT NULL,
+                event_id INTEGER,
+                creator INTEGER,
+                event_start REAL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS events_guild_start ON events (guild_id, event_start);
+            CREATE TABLE IF NOT EXISTS attendance (
+                post_id INTEGER NOT NULL REFERENCES events (post_id) ON DELETE CASCADE,
+                guild_id INTEGER NOT NULL,
+                member_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                PRIMARY KEY (post_id, member_id)
+            );
+            CREATE INDEX IF NOT EXISTS attendance_guild_member ON attendance (guild_id, member_id);
+            """
+        )
+
+    async def _run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, func, *args)
+
+    def _load_events(self, guild_id: int, post_id: Optional[int] = None) -> Dict[str, dict]:
+        if post_id is None:
+            rows = self._db.execute("SELECT post_id, data FROM events WHERE guild_id = ? ORDER BY event_start", (guild_id,))
+            attendance = self._db.execute("SELECT post_id, member_id, status FROM attendance WHERE guild_id = ? ORDER BY rowid", (guild_id,))
+        else:
+            rows = self._db.execute("SELECT post_id, data FROM events WHERE post_id = ?", (post_id,))
+            attendance = self._db.execute("SELECT post_id, member_id, status FROM attendance WHERE post_id = ? ORDER BY rowid", (post_id,))
+
+        events = {}
+        for row_post_id, data in rows.fetchall():
+            event = json.loads(data)
+            for key in ATTENDANCE:
+                event[key] = {}
+            events[str(row_post_id)] = event
+
+        for row_post_id, member_id, status in attendance.fetchall():
+            event = events.get(str(row_post_id))
+            if event is not None:
+                event.setdefault(status, {})[str(member_id)] = str(member_id)
+        return events
+
+    def _write_event(self, guild_id: int, event: dict) -> None:
+        post_id = int(event["post_id"])
+        data = {key: value for key, value in event.items() if key not in ATTENDANCE}
+        self._db.execute(
+            "INSERT INTO events (post_id, guild_id, event_id, creator, event_start, data) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (post_id) DO UPDATE SET event_id = excluded.event_id, creator = excluded.creator, "
+            "event_start = excluded.event_start, data = excluded.data",
+            (post_id, guild_id, event["id"], event["creator"], event["event_start"], json.dumps(data))
+        )
+        self._db.execute("DELETE FROM attendance WHERE post_id = ?", (post_id,))
+        rows = []
+        for key in ATTENDANCE:
+            for member_id in event.get(key, {}):
+                rows.append((post_id, guild_id, int(member_id), key))
+        self._db.executemany("INSERT OR REPLACE INTO attendance (post_id, guild_id, member_id, status) VALUES (?, ?, ?, ?)", rows)
+
+    def _save_events(self, guild_id: int, events: List[dict]) -> None:
+        with self._db:
+            self._db.execute("BEGIN")
+            for event in events:
+                self._write_event(guild_id, event)
+
+    def _save_attendance(self, guild_id: int, post_id: int, member_id: int, status: Optional[str]) -> None:
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM attendance WHERE post_id = ? AND member_id = ?", (post_id, member_id))
+            if status is not None:
+                # Events that are still being published get their attendance with the batch write
+                self._db.execute(
+                    "INSERT INTO attendance (post_id, guild_id, member_id, status) SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM events WHERE post_id = ?)",
+                    (post_id, guild_id, member_id, status, post_id)
+                )
+
+    def _delete_event(self, post_id: int) -> Optional[dict]:
+        events = self._load_events(0, post_id)
+        self._db.execute("DELETE FROM events WHERE post_id = ?", (post_id,))
+        return events.get(str(post_id))
+
+    def _clear(self, guild_id: int) -> None:
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM attendance WHERE guild_id = ?", (guild_id,))
+            self._db.execute("DELETE FROM events WHERE guild_id = ?", (guild_id,))
+
+    async def load_events(self, guild: discord.Guild) -> Dict[str, dict]:
+        return await self._run(self._load_events, guild.id)
+
+    async def load_event(self, guild: discord.Guild, post_id: str) -> Optional[dict]:
+        events = await self._run(self._load_events, guild.id, int(post_id))
+        return events.get(str(post_id))
+
+    async def save_event(self, guild: discord.Guild, event: dict) -> None:
+        await self._run(self._save_events, guild.id, [event])
+
+    async def save_events(self, guild: discord.Guild, events: List[dict]) -> None:
+        await self._run(self._save_events, guild.id, events)
+
+    async def save_attendance(self, guild: discord.Guild, event: dict, member_id: int) -> None:
+        status = None
+        for key in ATTENDANCE:
+            if str(member_id) in event.get(key, {}) or int(member_id) in event.get(key, {}):
+                status = key
+                break
+        await self._run(self._save_attendance, guild.id, int(event["post_id"]), int(member_id), status)
+
+    async def delete_event(self, guild: discord.Guild, post_id: str) -> Optional[dict]:
+        return await self._run(self._delete_event, int(post_id))
+
+    async def clear(self, guild: discord.Guild) -> None:
+        await self._run(self._clear, guild.id)
+
+    async def close(self) -> None:
+        await self._run(self._db.close)
+        self._executor.shutdown(wait=False)
+
+
+async def migrate_events(source, target, guilds: List[discord.abc.Snowflake]) -> int:
+    """Copy every event from one store into the other and clear the source. Returns the number of events moved."""
+    moved = 0
+    for guild in guilds:
+        events = await source.load_events(guild)
+        if len(events) == 0:
+            continue
+        await target.save_events(guild, list(events.values()))
+        await source.clear(guild)
+        moved += len(events)
+    log.info(f"Migrated {moved} events from {source.name} to {target.name}")
+    return moved
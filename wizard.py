@@ -0,0 +1,80 @@
+import asyncio
+from typing import Dict, Tuple
+
+import discord
+
+import logging
+
+log = logging.getLogger("red.burnacid.eventboard")
+
+
+class WizardSessions:
+    """
+    Routes DM replies to the wizard waiting for them.
+
+    Instead of every open wizard registering its own `wait_for` predicate, wizards wait on a future
+    keyed by (user id, DM channel id). The cog's single message listener hands each DM to `dispatch`,
+    which finds the waiting wizard with one dict lookup. Timeouts are scheduled here as well.
+    """
+
+    def __init__(self):
+        self._waiting: Dict[Tuple[int, int], Tuple[asyncio.Future, asyncio.TimerHandle]] = {}
+
+    def __len__(self) -> int:
+        return len(self._waiting)
+
+    async def wait_for_reply(self, user: discord.abc.User, channel: discord.DMChannel, timeout: float) -> discord.Message:
+        """
+        Wait for the next message of the user in the DM channel.
+
+        Raises `asyncio.TimeoutError` when the user doesn't reply in time, or when a newer wizard of the same user takes over the channel.
+        """
+        loop = asyncio.get_event_loop()
+        key = (user.id, channel.id)
+
+        previous = self._waiting.pop(key, None)
+        if previous is not None:
+            self._expire_entry(previous)
+
+        future = loop.create_future()
+        handle = loop.call_later(timeout, self._expire, key, future)
+        self._waiting[key] = (future, handle)
+        try:
+            return await future
+        finally:
+            handle.cancel()
+            entry = self._waiting.get(key)
+            if entry is not None and entry[0] is future:
+                del self._waiting[key]
+
+    def _expire(self, key: Tuple[int, int], future: asyncio.Future) -> None:
+        entry = self._waiting.get(key)
+        if entry is not None and entry[0] is future:
+            del self._waiting[key]
+        if not future.done():
+            future.set_exception(asyncio.TimeoutError())
+
+    def _expire_entry(self, entry: Tuple[asyncio.Future, asyncio.TimerHandle]) -> None:
+        future, handle = entry
+        handle.cancel()
+        if not future.done():
+            future.set_exception(asyncio.TimeoutError())
+
+    def dispatch(self, message: discord.Message) -> bool:
+        """Hand a DM to the wizard waiting for it. Returns whether a wizard took the message."""
+        entry = self._waiting.pop((message.author.id, message.channel.id), None)
+        if entry is None:
+            return False
+
+        future, handle = entry
+        handle.cancel()
+        if not future.done():
+            future.set_result(message)
+        return True
+
+    def cancel_all(self) -> None:
+        for entry in self._waiting.values():
+            future, handle = entry
+            handle.cancel()
+            future.cancel()
+        self._waiting.clear()